@@ -0,0 +1,35 @@
+"""Timings of the permutation algorithms (chapter 1.3.3).
+
+Run from the `python` directory with `python -m benchmarks.bench_permutations`.
+"""
+
+import random
+import timeit
+
+from permutations import permutation_product_A
+
+
+def random_cycles(n, count, length, seed=0):
+    """Return `count` random cycles of `length` distinct elements taken from 1..n."""
+    rng = random.Random(seed)
+    return [tuple(rng.sample(range(1, n + 1), length)) for _ in range(count)]
+
+
+def bench_product_A(sizes=(1, 2, 4, 8, 16, 32, 64, 128, 256), n=50, length=5, repeat=3):
+    """Compare the literal and indexed versions of algorithm A as the number of cycles grows.
+
+    :return: a list of (number of cycles, literal time, indexed time) tuples, times in seconds
+    """
+    rows = []
+    for count in sizes:
+        cycles = random_cycles(n, count, length)
+        literal = min(timeit.repeat(lambda: permutation_product_A(cycles), number=1, repeat=repeat))
+        indexed = min(timeit.repeat(lambda: permutation_product_A(cycles, indexed=True), number=1, repeat=repeat))
+        rows.append((count, literal, indexed))
+    return rows
+
+
+if __name__ == '__main__':
+    print('%8s %12s %12s %8s' % ('cycles', 'literal (s)', 'indexed (s)', 'speedup'))
+    for (count, literal, indexed) in bench_product_A():
+        print('%8d %12.6f %12.6f %8.2f' % (count, literal, indexed, literal / indexed))
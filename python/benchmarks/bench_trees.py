@@ -0,0 +1,132 @@
+"""Timings of the tree algorithms (chapter 2.3).
+
+Run from the `python` directory with `python -m benchmarks.bench_trees`.
+"""
+
+import io
+import random
+import re
+import time
+
+from expressions import eliminate_common_subexpressions, simplify, size
+from trees import BTree, differentiate
+
+
+def chain_string(depth, op='OP|+'):
+    """Serialized tree of the expression x + (x + (... + x)), `depth` levels deep."""
+    return ('((VAR|x) %s ' % op) * depth + '(VAR|x)' + ')' * depth
+
+
+def balanced_string(depth, seed=0):
+    """Serialized complete binary tree of the given depth, with random operators and leaves."""
+    rng = random.Random(seed)
+    leaves = ['(VAR|x)', '(VAR|y)', '(CONST|2)']
+    ops = ['OP|+', 'OP|-', 'OP|*', 'OP|/']
+    level = [rng.choice(leaves) for _ in range(2 ** depth)]
+    while len(level) > 1:
+        level = ['(%s %s %s)' % (level[i], rng.choice(ops), level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0]
+
+
+def recursive_from_string(s):
+    """The original recursive descent parser, kept as a reference for `bench_parse`.
+
+    It is limited by the recursion limit, so it fails on deep trees.
+    """
+    tokens = iter(re.findall(r'[^()]+|\(|\)', s.replace(' ', '')))
+
+    def parse_root():
+        if next(tokens) != '(':
+            raise ValueError
+        return parse_inner()
+
+    def parse_inner():
+        cur = next(tokens)
+        if cur == ')':
+            return None
+        elif cur != '(':
+            result = BTree(cur)
+        else:
+            left = parse_inner()
+            value = next(tokens)
+            right = parse_root()
+            result = BTree(value, left, right)
+        if next(tokens) != ')':
+            raise ValueError
+        return result
+
+    return parse_root()
+
+
+def _best_time(f, s, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f(s)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_parse(sizes=(10, 12, 14, 16)):
+    """Parsing throughput on deep and balanced trees, from a string and from a file.
+
+    :return: a list of (shape, size in bytes, MB/s from string, MB/s from file, speedup of `from_string` over the
+    recursive parser) tuples. The speedup is None where the recursive parser hits the recursion limit.
+    """
+    rows = []
+    for depth in sizes:
+        for (shape, s) in (('chain', chain_string(2 ** depth)), ('balanced', balanced_string(depth))):
+            from_string = _best_time(BTree.from_string, s)
+            from_file = _best_time(lambda s: BTree.from_file(io.BytesIO(s.encode())), s)
+            try:
+                speedup = _best_time(recursive_from_string, s) / from_string
+            except RecursionError:
+                speedup = None
+            rows.append((shape, len(s), len(s) / from_string / 1e6, len(s) / from_file / 1e6, speedup))
+    return rows
+
+
+def bench_differentiate(sizes=(10, 12, 14)):
+    """Time taken by `differentiate` on deep and balanced trees.
+
+    :return: a list of (shape, number of nodes, time in seconds) tuples
+    """
+    rows = []
+    for depth in sizes:
+        for (shape, s) in (('chain', chain_string(2 ** depth, 'OP|*')), ('balanced', balanced_string(depth))):
+            t = BTree.from_string(s)
+            start = time.perf_counter()
+            differentiate(t, 'x')
+            rows.append((shape, s.count('('), time.perf_counter() - start))
+    return rows
+
+
+def bench_simplify(orders=5, expression='(((VAR|x) OP|^ (CONST|3)) OP|/ (((VAR|x) OP|+ (CONST|1)) OP|ln ()))'):
+    """Node counts of successive derivatives of an expression, before and after simplification.
+
+    :return: a list of (order, nodes, nodes after CSE, nodes after simplification, distinct nodes after
+    simplification) tuples
+    """
+    rows = []
+    d = BTree.from_string(expression)
+    for order in range(1, orders + 1):
+        d = differentiate(d, 'x')
+        s = simplify(d)
+        rows.append((order, size(d), size(eliminate_common_subexpressions(d), True), size(s), size(s, True)))
+    return rows
+
+
+if __name__ == '__main__':
+    print('%10s %12s %12s %12s %12s' % ('shape', 'bytes', 'string MB/s', 'file MB/s', 'vs recursive'))
+    for (shape, n, from_string, from_file, speedup) in bench_parse():
+        print('%10s %12d %12.2f %12.2f %12s' % (shape, n, from_string, from_file,
+                                                'n/a' if speedup is None else '%.2fx' % speedup))
+    print()
+    print('%10s %12s %12s' % ('shape', 'nodes', 'time (s)'))
+    for row in bench_differentiate():
+        print('%10s %12d %12.6f' % row)
+    print()
+    print('%6s %10s %10s %12s %12s' % ('order', 'nodes', 'CSE', 'simplified', 'simpl.+CSE'))
+    for row in bench_simplify():
+        print('%6d %10d %10d %12d %12d' % row)
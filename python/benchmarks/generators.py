@@ -0,0 +1,100 @@
+"""Random inputs for the benchmarks, in the formats taken by the algorithm modules.
+
+Every generator is deterministic for a given seed, so that timings of successive runs are comparable.
+"""
+
+import random
+
+from benchmarks.bench_trees import balanced_string, chain_string
+
+
+def random_permutation(n, seed=0):
+    """Return a uniformly random permutation of 1..n as a list of cycles (fixed points omitted)."""
+    rng = random.Random(seed)
+    table = list(range(n + 1))
+    tail = table[1:]
+    rng.shuffle(tail)
+    table[1:] = tail
+    cycles = []
+    seen = [False] * (n + 1)
+    for i in range(1, n + 1):
+        if seen[i] or table[i] == i:
+            continue
+        cycle = []
+        j = i
+        while not seen[j]:
+            seen[j] = True
+            cycle.append(j)
+            j = table[j]
+        cycles.append(tuple(cycle))
+    return cycles
+
+
+def random_dag(n, edges, seed=0):
+    """Return `edges` random relations (j, k) on the objects 1..n which admit a topological order.
+
+    A random order of the objects is drawn first, and each relation goes from an object to a later one.
+    """
+    rng = random.Random(seed)
+    order = list(range(1, n + 1))
+    rng.shuffle(order)
+    relations = []
+    for _ in range(edges):
+        (j, k) = sorted(rng.sample(range(n), 2))
+        relations.append((order[j], order[k]))
+    return relations
+
+
+def sparse_polynomial(terms, max_exponent=None, seed=0):
+    """Return a random polynomial in x, y, z with `terms` non-zero terms, in the list format of chapter 2.2.4.
+
+    :param max_exponent: bound on each exponent (by default, just large enough to hold the terms)
+    """
+    rng = random.Random(seed)
+    if max_exponent is None:
+        max_exponent = max(2, round(terms ** (1 / 3)) * 2)
+    if terms > (max_exponent + 1) ** 3:
+        raise ValueError("Not enough exponents for %d terms" % terms)
+    exponents = set()
+    while len(exponents) < terms:
+        exponents.add(tuple(rng.randint(0, max_exponent) for _ in range(3)))
+    p = [(rng.choice((-1, 1)) * rng.randint(1, 9), abc) for abc in sorted(exponents, reverse=True)]
+    return p + [(0, (0, 0, -1))]
+
+
+def deep_tree(nodes):
+    """Serialized expression tree x + (x + (... + x)) with about `nodes` nodes (depth nodes / 2)."""
+    return chain_string(max(1, nodes // 2))
+
+
+def wide_tree(nodes, seed=0):
+    """Serialized complete binary expression tree with about `nodes` nodes (depth log2(nodes))."""
+    return balanced_string(max(1, nodes.bit_length() - 1), seed)
+
+
+def record_layout(entries, depth=4, width=5, seed=0):
+    """Return a (level, name) sequence describing records, as read from a COBOL data division.
+
+    Records are level 1 groups of 1 to `width` fields; about half of the fields are in turn groups of 1 to `width`
+    subfields, down to `depth` levels below the record, with levels numbered 1, 5, 10, 15... Names are unique, and end
+    with a letter so that the data table keys (name followed by level) are unique too. The sequence stops after
+    `entries` entries.
+    """
+    rng = random.Random(seed)
+    sequence = []
+    count = 0
+    while len(sequence) < entries:
+        sequence.append((1, 'R%d-X' % count))
+        count += 1
+        # (depth d of the group being filled, number of its subfields still to be generated)
+        stack = [(0, rng.randint(1, width))]
+        while len(stack) > 0 and len(sequence) < entries:
+            (d, remaining) = stack.pop()
+            if remaining > 1:
+                stack.append((d, remaining - 1))
+            sequence.append((5 * (d + 1), 'F%d-X' % count))
+            count += 1
+            if d + 1 < depth and rng.random() < 0.5:
+                stack.append((d + 1, rng.randint(1, width)))
+    return sequence
+
@@ -0,0 +1,179 @@
+"""Scaling benchmarks of the algorithm modules, with JSON results and regression checks.
+
+Each case times one algorithm on generated inputs of increasing sizes, and records for every size the best time over
+a few runs and the peak memory allocated during one run (measured with `tracemalloc`, in a separate run since tracing
+slows the code down). Results can be saved as JSON, and compared with a previous run: a case regresses when its time
+or peak memory exceeds the baseline by more than a threshold.
+
+Run from the `python` directory, e.g.:
+
+    python -m benchmarks.suite --output base.json
+    python -m benchmarks.suite --baseline base.json --threshold 0.25
+
+The second command exits with status 1 if a regression is found.
+"""
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.generators import (deep_tree, random_dag, random_permutation, record_layout, sparse_polynomial,
+                                   wide_tree)
+from linkedlists import polynomial_multiplication, topological_sort
+from multilink import build_data_table
+from permutations import permutation_inverse_I, permutation_product_A, permutation_product_B, permutation_product_batch
+from trees import BTree, differentiate
+
+
+class Case(object):
+    """A benchmark: `setup(size)` builds the arguments passed to `function`, outside of the measurements."""
+
+    def __init__(self, name, function, setup, sizes):
+        self.name = name
+        self.function = function
+        self.setup = setup
+        self.sizes = sizes
+
+
+def _permutations(n, count=4):
+    return [random_permutation(n, seed) for seed in range(count)]
+
+
+CASES = [
+    Case('permutation_product_A', permutation_product_A, lambda n: (_permutations(n),), (100, 200, 400, 800)),
+    Case('permutation_product_B', permutation_product_B, lambda n: (_permutations(n),), (1000, 4000, 16000, 64000)),
+    Case('permutation_product_batch', lambda perms: permutation_product_batch([perms]),
+         lambda n: (_permutations(n),), (1000, 4000, 16000, 64000)),
+    Case('permutation_inverse_I', permutation_inverse_I, lambda n: (random_permutation(n),),
+         (1000, 4000, 16000, 64000)),
+    Case('topological_sort', topological_sort, lambda n: (random_dag(n, 4 * n),), (1000, 4000, 16000, 64000)),
+    Case('polynomial_multiplication', polynomial_multiplication,
+         lambda n: (sparse_polynomial(n, seed=1), sparse_polynomial(n, seed=2)), (25, 50, 100, 200)),
+    Case('from_string_deep', BTree.from_string, lambda n: (deep_tree(n),), (1000, 4000, 16000, 64000)),
+    Case('from_string_wide', BTree.from_string, lambda n: (wide_tree(n),), (1000, 4000, 16000, 64000)),
+    Case('differentiate_deep', differentiate, lambda n: (BTree.from_string(deep_tree(n)), 'x'),
+         (1000, 4000, 16000, 64000)),
+    Case('differentiate_wide', differentiate, lambda n: (BTree.from_string(wide_tree(n)), 'x'),
+         (1000, 4000, 16000, 64000)),
+    Case('build_data_table', build_data_table, lambda n: (record_layout(n),), (1000, 4000, 16000, 64000)),
+]
+
+
+def measure(function, args, repeat=3):
+    """Return (best time in seconds over `repeat` runs, peak memory in bytes) for function(*args)."""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(cases=None, sizes=None, repeat=3, quick=False):
+    """Run the benchmarks.
+
+    :param cases: names of the cases to run (all by default)
+    :param sizes: sizes to use instead of the default ones of each case
+    :param repeat: number of timed runs for each size
+    :param quick: only run the two smallest default sizes of each case
+    :return: a dict with the environment and, for each case, a list of {size, time, peak} rows
+    """
+    results = {'python': platform.python_version(), 'platform': platform.platform(), 'cases': {}}
+    for case in CASES:
+        if cases is not None and case.name not in cases:
+            continue
+        rows = []
+        for n in sizes or (case.sizes[:2] if quick else case.sizes):
+            (seconds, peak) = measure(case.function, case.setup(n), repeat)
+            rows.append({'size': n, 'time': seconds, 'peak': peak})
+        results['cases'][case.name] = rows
+    return results
+
+
+def scaling(rows):
+    """Return the empirical exponent of the time taken between successive sizes: t ~ size^e.
+
+    :return: a list with None for the first row, then log(t2/t1) / log(n2/n1)
+    """
+    exponents = [None]
+    for (a, b) in zip(rows, rows[1:]):
+        if a['time'] > 0 and b['time'] > 0 and b['size'] != a['size']:
+            exponents.append(math.log(b['time'] / a['time']) / math.log(b['size'] / a['size']))
+        else:
+            exponents.append(None)
+    return exponents
+
+
+def compare(baseline, results, threshold=0.25):
+    """Compare results with a baseline, for the cases and sizes present in both.
+
+    :param threshold: relative increase over the baseline tolerated before reporting a regression
+    :return: a list of (case, size, metric, baseline value, new value) tuples for the regressions
+    """
+    regressions = []
+    for (name, rows) in results['cases'].items():
+        previous = {row['size']: row for row in baseline['cases'].get(name, [])}
+        for row in rows:
+            if row['size'] not in previous:
+                continue
+            for metric in ('time', 'peak'):
+                old = previous[row['size']][metric]
+                if row[metric] > old * (1 + threshold):
+                    regressions.append((name, row['size'], metric, old, row[metric]))
+    return regressions
+
+
+def report(results):
+    """Format the scaling curves of each case as text."""
+    lines = []
+    for (name, rows) in results['cases'].items():
+        lines.append(name)
+        lines.append('%10s %12s %12s %8s' % ('size', 'time (s)', 'peak (KiB)', 'exponent'))
+        for (row, e) in zip(rows, scaling(rows)):
+            lines.append('%10d %12.6f %12.1f %8s' % (row['size'], row['time'], row['peak'] / 1024,
+                                                     '' if e is None else '%.2f' % e))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('cases', nargs='*', help="cases to run (default: all of %s)" % ', '.join(c.name for c in CASES))
+    parser.add_argument('--sizes', type=int, nargs='+', help="input sizes, instead of the default ones of each case")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs for each size")
+    parser.add_argument('--quick', action='store_true', help="only run the two smallest sizes of each case")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON file of a previous run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.25, help="tolerated relative increase (default 0.25)")
+    args = parser.parse_args(argv)
+    unknown = set(args.cases) - set(c.name for c in CASES)
+    if unknown:
+        parser.error("unknown cases: %s" % ', '.join(sorted(unknown)))
+    results = run(args.cases or None, args.sizes, args.repeat, args.quick)
+    print(report(results))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for (name, n, metric, old, new) in regressions:
+            print('REGRESSION %s size %d: %s %.6g -> %.6g (%+.0f%%)' % (name, n, metric, old, new,
+                                                                       100 * (new / old - 1)))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""Simplification and evaluation of the expression trees used by `trees.differentiate`.
+
+Trees whose nodes are `CONST|c`, `VAR|name` or `OP|op` are compiled to Python functions. The generated code only uses
+arithmetic operators and `ln`, so the same function can be called with numbers or with NumPy arrays (evaluating the
+expression over all the sample points at once). NumPy is optional: when it is not installed, `ln` is `math.log` and
+only numbers are supported.
+
+`simplify` rewrites a tree with algebraic identities, and `eliminate_common_subexpressions` turns it into a DAG where
+every distinct subexpression is a single node.
+"""
+
+import collections
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from trees import MathError, NodeFactory, ParseError
+
+_binary_ops = {'+': '+', '-': '-', '*': '*', '/': '/', '^': '**'}
+_namespace = {'ln': numpy.log if numpy is not None else math.log}
+
+
+def constant(value):
+    """Return the number represented by the value of a `CONST` node."""
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def variables(t):
+    """Return the sorted list of the variable names appearing in tree `t`."""
+    names = set()
+    stack = [t]
+    while len(stack) > 0:
+        p = stack.pop()
+        if p is None:
+            continue
+        if p.value.startswith('VAR|'):
+            names.add(p.value[4:])
+        stack.append(p.left)
+        stack.append(p.right)
+    return sorted(names)
+
+
+def to_source(t, names):
+    """Generate the source of a Python function evaluating tree `t`.
+
+    Every distinct subexpression is assigned to a local variable the first time it is met, and reused afterwards: a
+    subexpression appearing several times in the tree (or shared in a DAG) is only evaluated once.
+
+    :param t: the tree to compile
+    :param names: the names of the variables, in the order of the arguments of the function
+    :return: the source of a function called `f`
+    """
+    args = {name: 'x%d' % i for (i, name) in enumerate(names)}
+    lines = ['def f(%s):' % ', '.join(args[name] for name in names)]
+    # local variable holding each node, and each distinct subexpression (value, left local, right local)
+    locals_by_node = {}
+    locals_by_expression = {}
+    stack = [(t, False)]
+    while len(stack) > 0:
+        (p, expanded) = stack.pop()
+        if p in locals_by_node:
+            continue
+        if not expanded:
+            stack.append((p, True))
+            for c in (p.right, p.left):
+                if c is not None:
+                    stack.append((c, False))
+            continue
+        (ty, val) = p.value.split('|')
+        left = locals_by_node.get(p.left)
+        right = locals_by_node.get(p.right)
+        key = (p.value, left, right)
+        if key not in locals_by_expression:
+            if ty == 'CONST':
+                code = repr(constant(val))
+            elif ty == 'VAR':
+                if val not in args:
+                    raise ValueError("Unknown variable %s" % val)
+                code = args[val]
+            elif ty != 'OP':
+                raise ParseError("Unexpected type %s" % ty)
+            elif val == 'neg':
+                code = '-%s' % left
+            elif val == 'ln':
+                code = 'ln(%s)' % left
+            elif val in _binary_ops and left is not None and right is not None:
+                code = '%s %s %s' % (left, _binary_ops[val], right)
+            else:
+                raise ParseError("Unexpected operator %s" % val)
+            local = 't%d' % len(locals_by_expression)
+            lines.append('    %s = %s' % (local, code))
+            locals_by_expression[key] = local
+        locals_by_node[p] = locals_by_expression[key]
+    lines.append('    return %s' % locals_by_node[t])
+    return '\n'.join(lines) + '\n'
+
+
+class _FunctionCache(object):
+    """The functions compiled by `compile_tree`, by tree and variable names, least recently used first.
+
+    Trees are interned in a `NodeFactory`, so that trees with the same structure are found under the same key without
+    generating their source. Evicting a function does not release the nodes of its tree from the factory: once the
+    factory has doubled since it was last renewed, the trees still in the cache are interned in a new one.
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.functions = collections.OrderedDict()
+        self.factory = NodeFactory()
+        # number of nodes of the factory when it was renewed
+        self.renewed = 0
+
+    def get(self, t, names):
+        """Return the function evaluating tree `t`, compiling it if needed.
+
+        :param names: tuple of the names of the arguments, or None for the sorted names of the variables of `t`
+        """
+        key = (self.factory.intern(t), names)
+        f = self.functions.get(key)
+        if f is not None:
+            self.functions.move_to_end(key)
+            return f
+        root = key[0]
+        namespace = dict(_namespace)
+        exec(compile(to_source(root, variables(root) if names is None else names), '<expression>', 'exec'), namespace)
+        f = self.functions[key] = namespace['f']
+        if len(self.functions) > self.size:
+            self.functions.popitem(last=False)
+            if len(self.factory) > 2 * self.renewed:
+                self.renew()
+        return f
+
+    def renew(self):
+        """Intern the trees of the cache in a new factory, dropping the nodes of the evicted ones."""
+        factory = NodeFactory()
+        self.functions = collections.OrderedDict(((factory.intern(root), names), f)
+                                                 for ((root, names), f) in self.functions.items())
+        self.factory = factory
+        self.renewed = len(factory)
+
+
+_cache = _FunctionCache()
+
+
+def compile_tree(t, names=None):
+    """Compile tree `t` to a Python function.
+
+    :param t: the tree to compile
+    :param names: the names of the variables, in the order in which the function takes them as arguments. Defaults
+    to the sorted names of the variables appearing in `t`.
+    :return: a function of the variables, which can be called with numbers or NumPy arrays. Trees with the same
+    structure share the same compiled function, as long as it is in the cache of the last 256 compiled ones.
+    """
+    return _cache.get(t, None if names is None else tuple(names))
+
+
+def evaluate(t, **values):
+    """Evaluate tree `t` for the given values of its variables."""
+    names = sorted(values)
+    return compile_tree(t, names)(*[values[name] for name in names])
+
+
+def size(t, distinct=False):
+    """Return the number of nodes of tree `t`; with `distinct=True`, shared nodes are only counted once."""
+    count = 0
+    seen = set()
+    stack = [t]
+    while len(stack) > 0:
+        p = stack.pop()
+        if p is None:
+            continue
+        if distinct:
+            if p in seen:
+                continue
+            seen.add(p)
+        count += 1
+        stack.append(p.left)
+        stack.append(p.right)
+    return count
+
+
+def eliminate_common_subexpressions(t, factory=None):
+    """Return a DAG equivalent to tree `t`, in which structurally equal subtrees are a single node."""
+    if factory is None:
+        factory = NodeFactory()
+    return factory.intern(t)
+
+
+def _format_constant(c):
+    if isinstance(c, float) and c.is_integer():
+        c = int(c)
+    return 'CONST|%r' % c
+
+
+def _fold(op, a, b):
+    """Compute op(a, b) on constants, or return None if the result is not a finite real number."""
+    try:
+        if op == '+':
+            result = a + b
+        elif op == '-':
+            result = a - b
+        elif op == '*':
+            result = a * b
+        elif op == '/':
+            result = a / b
+        elif op == '^':
+            result = a ** b
+        elif op == 'neg':
+            result = -a
+        elif op == 'ln':
+            result = math.log(a)
+        else:
+            return None
+        if not isinstance(result, (int, float)) or not math.isfinite(result):
+            # complex powers of negative numbers, infinities and NaNs (e.g. 1e308 * 10)
+            return None
+    except (ArithmeticError, ValueError):
+        return None
+    if isinstance(result, float) and op in ('/', 'ln') and result.is_integer():
+        return int(result)
+    return result
+
+
+class Simplifier(object):
+    """Bottom-up rewriting of expression trees.
+
+    Nodes are built through a `NodeFactory`, so structurally equal subtrees are the same node and can be recognized
+    in O(1). Each node is rewritten once its operands are simplified, repeatedly, until no rule applies; nodes created
+    by a rule are simplified in turn.
+
+    The rules are:
+    * constant folding (e.g. 2*3 -> 6, ln(1) -> 0), except where the result would not be a real number;
+    * identities: x+0, x-0, x*1, x/1, x^1 -> x; x*0, 0/x, x-x -> 0; x^0, x/x -> 1; 0-x -> neg x; neg neg x -> x;
+      x + neg y -> x - y; x - neg y -> x + y;
+    * collection of like terms: constants are moved to the left of products, then x+x -> 2*x, a*x + b*x -> (a+b)*x,
+      a*x - b*x -> (a-b)*x, a*(b*x) -> (a*b)*x, x*x -> x^2 and x^a * x^b -> x^(a+b) for constant a and b.
+
+    A division whose divisor simplifies to 0 raises `MathError`, as in `differentiate`.
+    """
+
+    def __init__(self, factory=None):
+        self.factory = NodeFactory() if factory is None else factory
+        self.simplified = {}
+
+    def simplify(self, t):
+        """Return the simplified version of tree `t`."""
+        t = self.factory.intern(t)
+        stack = [(t, False)]
+        while len(stack) > 0:
+            (p, expanded) = stack.pop()
+            if p is None or p in self.simplified:
+                continue
+            if not expanded:
+                stack.append((p, True))
+                stack.append((p.right, False))
+                stack.append((p.left, False))
+                continue
+            left = self.simplified[p.left] if p.left is not None else None
+            right = self.simplified[p.right] if p.right is not None else None
+            self.simplified[p] = self.node(p.value, left, right)
+        return self.simplified[t]
+
+    def node(self, value, left=None, right=None):
+        """Build a node from simplified operands, and rewrite it until no rule applies."""
+        p = self.factory(value, left, right)
+        while True:
+            if p in self.simplified:
+                return self.simplified[p]
+            q = self.rewrite(p)
+            if q is None:
+                self.simplified[p] = p
+                return p
+            self.simplified[p] = q
+            p = q
+
+    def const(self, c):
+        return self.factory(_format_constant(c))
+
+    def rewrite(self, p):
+        """Apply one rule to node `p` (whose operands are simplified); return None if no rule applies."""
+        (ty, op) = p.value.split('|')
+        if ty != 'OP':
+            return None
+        u, v = p.left, p.right
+        cu = _constant_of(u)
+        cv = _constant_of(v)
+        node = self.node
+        # constant folding
+        if cu is not None and (op in ('neg', 'ln') or cv is not None):
+            c = _fold(op, cu, cv)
+            if c is not None:
+                return self.const(c)
+        if op == 'neg':
+            if u.value == 'OP|neg':
+                return u.left
+            return None
+        if op == 'ln':
+            return None
+        if op == '+':
+            if cu == 0:
+                return v
+            if cv == 0:
+                return u
+            if v.value == 'OP|neg':
+                return node('OP|-', u, v.left)
+            if u.value == 'OP|neg':
+                return node('OP|-', v, u.left)
+            (a, x), (b, y) = self.split_coefficient(u), self.split_coefficient(v)
+            if x is y:
+                return node('OP|*', self.const(a + b), x)
+            return None
+        if op == '-':
+            if cv == 0:
+                return u
+            if cu == 0:
+                return node('OP|neg', v)
+            if u is v:
+                return self.const(0)
+            if v.value == 'OP|neg':
+                return node('OP|+', u, v.left)
+            (a, x), (b, y) = self.split_coefficient(u), self.split_coefficient(v)
+            if x is y:
+                return node('OP|*', self.const(a - b), x)
+            return None
+        if op == '*':
+            if cu == 0 or cv == 0:
+                return self.const(0)
+            if cu == 1:
+                return v
+            if cv == 1:
+                return u
+            if cv is not None and cu is None:
+                # constants go to the left
+                return node('OP|*', v, u)
+            if cu is not None and v.value == 'OP|*' and _constant_of(v.left) is not None:
+                return node('OP|*', node('OP|*', u, v.left), v.right)
+            (x, a), (y, b) = self.split_exponent(u), self.split_exponent(v)
+            if x is y and a is not None and b is not None:
+                return node('OP|^', x, self.const(a + b))
+            return None
+        if op == '/':
+            if cv == 0:
+                raise MathError("Division by zero")
+            if cv == 1:
+                return u
+            if cu == 0:
+                return self.const(0)
+            if u is v and cu != 0:
+                return self.const(1)
+            return None
+        if op == '^':
+            if cv == 0:
+                return self.const(1)
+            if cv == 1 or cu == 1:
+                return u
+            return None
+        return None
+
+    def split_coefficient(self, p):
+        """Write p as a*x with a constant; return (a, x)."""
+        if p.value == 'OP|*' and _constant_of(p.left) is not None:
+            return _constant_of(p.left), p.right
+        return 1, p
+
+    def split_exponent(self, p):
+        """Write p as x^a with a constant (None if the exponent is not constant); return (x, a)."""
+        if p.value == 'OP|^':
+            return p.left, _constant_of(p.right)
+        return p, 1
+
+
+def _constant_of(p):
+    """Return the number held by a CONST node, or None for any other node."""
+    if p is not None and p.value.startswith('CONST|'):
+        return constant(p.value[6:])
+    return None
+
+
+def simplify(t, factory=None):
+    """Simplify tree `t` (see `Simplifier` for the rules applied).
+
+    :param t: the tree to simplify
+    :param factory: the `NodeFactory` used to build the result (a new one by default)
+    :return: the simplified tree. Its nodes are shared, so it is also a DAG without common subexpressions.
+    :raises MathError: if the tree divides by an expression which simplifies to 0
+    """
+    return Simplifier(factory).simplify(t)
@@ -2,7 +2,16 @@
 
 """
 
-import itertools
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+
+class LoopError(ValueError):
+    """Raised when a relation would create a loop. The offending loop is stored in `loop`."""
+
+    def __init__(self, message, loop):
+        super(LoopError, self).__init__(message)
+        self.loop = loop
 
 def topological_sort(relations):
     """Implement algorithm T of chapter 2.2.3.
@@ -52,114 +61,580 @@ def topological_sort(relations):
         raise ValueError("Loop in input relations")
 
 
-def polynomial_addition(p, q):
+def topological_sort_labels(relations):
+    """Variant of algorithm T for large inputs whose objects are arbitrary hashable labels.
+
+    The relations are read in a single pass, so they can be any iterable (e.g. a generator over a file). Labels are
+    interned to dense ids 0..n-1 in order of appearance, and the successor lists of step T3 are stored in compressed
+    form: the successors of object j are succ[offset[j]:offset[j+1]], with both tables held in integer arrays.
+    When the relations contain a loop, one of them is located as in exercise 2.2.3-23: each object left over by
+    step T8 has a predecessor that is also left over, so following predecessors eventually comes back to an object
+    already visited.
+
+    :param relations: an iterable of pairs (j, k) of hashable labels, meaning that j precedes k
+    :return: a tuple (order, loop). `order` is the list of labels in sorted order (only the objects which could be
+    sorted if there is a loop); `loop` is None if the relations are a partial order, otherwise a list of labels such
+    that each precedes the next one and the last precedes the first.
+    """
+    # steps T1-T3: intern labels and record the relations
+    ids = {}
+    labels = []
+    source = array('l')
+    target = array('l')
+    for (j, k) in relations:
+        for label in (j, k):
+            if label not in ids:
+                ids[label] = len(labels)
+                labels.append(label)
+        source.append(ids[j])
+        target.append(ids[k])
+    n = len(labels)
+    # build the compressed successor lists with a counting sort on the source of each relation
+    offset = array('l', bytes(source.itemsize * (n + 1)))
+    for j in source:
+        offset[j + 1] += 1
+    for j in range(n):
+        offset[j + 1] += offset[j]
+    succ = array('l', bytes(source.itemsize * len(source)))
+    cursor = array('l', offset)
+    count = array('l', bytes(source.itemsize * n))
+    for (j, k) in zip(source, target):
+        succ[cursor[j]] = k
+        cursor[j] += 1
+        count[k] += 1
+    del source, target, cursor
+    # step T4
+    qlink = [k for k in range(n) if count[k] == 0]
+    order = []
+    # steps T5-T7
+    while len(qlink) > 0:
+        f = qlink.pop()
+        order.append(labels[f])
+        for k in succ[offset[f]:offset[f + 1]]:
+            count[k] -= 1
+            if count[k] == 0:
+                qlink.append(k)
+    # step T8
+    if len(order) == n:
+        return order, None
+    # find a loop: record one remaining predecessor of each remaining object, then follow predecessors
+    pred = {}
+    for j in range(n):
+        if count[j] > 0:
+            for k in succ[offset[j]:offset[j + 1]]:
+                if count[k] > 0:
+                    pred[k] = j
+    k = next(iter(pred))
+    seen = set()
+    while k not in seen:
+        seen.add(k)
+        k = pred[k]
+    loop = [k]
+    j = pred[k]
+    while j != k:
+        loop.append(j)
+        j = pred[j]
+    return order, [labels[j] for j in reversed(loop)]
+
+
+def _relation_lists(relations):
+    """Return the (top, count) tables of steps T1-T3 as dicts, for arbitrary hashable objects."""
+    top = {}
+    count = {}
+    for (j, k) in relations:
+        for x in (j, k):
+            if x not in top:
+                top[x] = []
+                count[x] = 0
+        top[j].append(k)
+        count[k] += 1
+    return top, count
+
+def topological_waves(relations):
+    """Variant of algorithm T returning the objects in successive waves instead of a single sequence.
+
+    The first wave holds the objects with no predecessor; each following wave holds the objects whose count drops to
+    zero once the previous wave is removed. All the objects of a wave can therefore be processed in parallel, and
+    the number of waves is the length of the longest chain of relations.
+
+    :param relations: an iterable of pairs (j, k) of hashable objects, meaning that j precedes k
+    :return: the list of waves, each being a list of objects
+    :raises ValueError: if the relations contain a loop
+    """
+    top, count = _relation_lists(relations)
+    wave = [k for k in count if count[k] == 0]
+    waves = []
+    N = len(count)
+    while len(wave) > 0:
+        waves.append(wave)
+        N -= len(wave)
+        next_wave = []
+        for f in wave:
+            for suc in top[f]:
+                count[suc] -= 1
+                if count[suc] == 0:
+                    next_wave.append(suc)
+        wave = next_wave
+    if N != 0:
+        raise ValueError("Loop in input relations")
+    return waves
+
+
+class ScheduleReport(object):
+    """Outcome of `run_topological`.
+
+    * `results` maps each object to the value returned by the action.
+    * `widths` holds the number of objects of each wave (see `topological_waves`).
+    * `critical_path` is the number of objects on the longest chain of relations, i.e. the number of waves.
+    * `order` lists the objects in the order in which their actions completed.
+    """
+    __slots__ = ('results', 'widths', 'critical_path', 'order')
+
+    def __init__(self, results, widths, order):
+        self.results = results
+        self.widths = widths
+        self.critical_path = len(widths)
+        self.order = order
+
+
+def run_topological(relations, action, executor=None, max_workers=None, processes=False):
+    """Call `action(x)` for every object x, in an order compatible with the relations, on a pool of workers.
+
+    This is algorithm T with the queue replaced by a pool: every object whose count is zero is submitted, and each
+    completion decrements the counts of the object's successors, submitting those which reach zero right away rather
+    than waiting for the rest of their wave.
+
+    :param relations: an iterable of pairs (j, k) of hashable objects, meaning that j precedes k
+    :param action: the callable to run on each object (it must be picklable if processes are used)
+    :param executor: a `concurrent.futures.Executor` to use. If None, a pool is created for the duration of the call.
+    :param max_workers: the size of the pool to create
+    :param processes: create a process pool rather than a thread pool
+    :return: a `ScheduleReport`
+    :raises ValueError: if the relations contain a loop
+    """
+    if executor is None:
+        pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with pool_class(max_workers) as pool:
+            return run_topological(relations, action, pool)
+    relations = list(relations)
+    waves = topological_waves(relations)
+    top, count = _relation_lists(relations)
+    results = {}
+    order = []
+    pending = {executor.submit(action, k): k for k in count if count[k] == 0}
+    while len(pending) > 0:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            f = pending.pop(future)
+            results[f] = future.result()
+            order.append(f)
+            for suc in top[f]:
+                count[suc] -= 1
+                if count[suc] == 0:
+                    pending[executor.submit(action, suc)] = suc
+    return ScheduleReport(results, [len(wave) for wave in waves], order)
+
+
+class IncrementalTopologicalOrder(object):
+    """Topological order maintained under insertion and deletion of relations.
+
+    The relations are kept as in algorithm T: `top[j]` holds the successors of j, and `pred[k]` the predecessors of k
+    instead of their count, so that the order can be repaired backwards.
+    Each object has a position in the order. Inserting a relation j < k which is already satisfied by the positions
+    costs O(1); otherwise only the objects positioned between k and j are examined, and those reachable from k or
+    leading to j are moved, keeping the positions they used (algorithm of Pearce and Kelly, 2006). Deletions never
+    invalidate the order.
+    """
+
+    def __init__(self, relations=()):
+        self.top = {}
+        self.pred = {}
+        self.position = {}
+        # objects by position; removed objects leave a None until the list is compacted
+        self.objects = []
+        for (j, k) in relations:
+            self.add_relation(j, k)
+
+    def __contains__(self, x):
+        return x in self.position
+
+    def __len__(self):
+        return len(self.position)
+
+    def add_object(self, x):
+        """Add an object with no relations at the end of the order (nothing happens if it is already present)."""
+        if x not in self.position:
+            self.top[x] = set()
+            self.pred[x] = set()
+            self.position[x] = len(self.objects)
+            self.objects.append(x)
+
+    def remove_object(self, x):
+        """Remove an object and all of its relations."""
+        for k in list(self.top[x]):
+            self.remove_relation(x, k)
+        for j in list(self.pred[x]):
+            self.remove_relation(j, x)
+        self.objects[self.position.pop(x)] = None
+        del self.top[x], self.pred[x]
+        if len(self.objects) > 2 * len(self.position):
+            # most positions are holes: renumber the objects, keeping their order
+            self.objects = self.order()
+            for (p, y) in enumerate(self.objects):
+                self.position[y] = p
+
+    def add_relation(self, j, k):
+        """Record that j precedes k, updating the order if needed.
+
+        :raises LoopError: if the relation would create a loop; neither the relation nor new objects are added in
+        that case.
+        """
+        if j == k:
+            raise LoopError("Loop in input relations", [j])
+        self.add_object(j)
+        self.add_object(k)
+        if k in self.top[j]:
+            return
+        lower, upper = self.position[k], self.position[j]
+        if lower < upper:
+            # forward search from k among the objects placed no further than j
+            forward = self._search(k, self.top, lambda p: p <= upper, j)
+            # backward search from j among the objects placed after k
+            backward = self._search(j, self.pred, lambda p: p > lower)
+            # move the objects leading to j before the ones reachable from k, reusing their positions
+            moved = sorted(backward, key=self.position.get) + sorted(forward, key=self.position.get)
+            positions = sorted(self.position[x] for x in moved)
+            for (x, p) in zip(moved, positions):
+                self.position[x] = p
+                self.objects[p] = x
+        self.top[j].add(k)
+        self.pred[k].add(j)
+
+    def remove_relation(self, j, k):
+        """Forget that j precedes k (nothing happens if the relation is not present)."""
+        if j in self.top and k in self.top[j]:
+            self.top[j].remove(k)
+            self.pred[k].remove(j)
+
+    def _search(self, start, links, allowed, goal=None):
+        """Depth-first search from `start` following `links`, restricted to objects whose position is `allowed`.
+
+        :return: the list of objects reached
+        :raises LoopError: if `goal` is reached
+        """
+        parent = {start: None}
+        stack = [start]
+        while len(stack) > 0:
+            x = stack.pop()
+            for y in links[x]:
+                if y == goal:
+                    # goal -> start -> ... -> x -> goal is a loop
+                    loop = [x]
+                    while parent[loop[-1]] is not None:
+                        loop.append(parent[loop[-1]])
+                    raise LoopError("Loop in input relations", [goal] + loop[::-1])
+                if y not in parent and allowed(self.position[y]):
+                    parent[y] = x
+                    stack.append(y)
+        return list(parent)
+
+    def order(self):
+        """Return the objects in topological order."""
+        return [x for x in self.objects if x is not None]
+
+
+def pack_abc(abc, bits):
+    """Pack exponents (a, b, c) into a single integer with fields of `bits` bits each, as in a MIX word.
+
+    The top bit of each field is kept clear as a guard bit, so each exponent must be smaller than 2^(bits-1): the sum
+    of two packed exponents then never carries from one field into the next, and an overflowing field shows up as a
+    set guard bit. Packed values compare like the (a, b, c) tuples, and multiplying two monomials amounts to adding
+    their packed exponents. The special (0, 0, -1) is packed as -1.
+
+    :raises OverflowError: if one of the exponents does not fit in its field
+    """
+    if abc == (0, 0, -1):
+        return -1
+    limit = 1 << (bits - 1)
+    result = 0
+    for e in abc:
+        if not 0 <= e < limit:
+            raise OverflowError("Exponent %d does not fit in %d bits" % (e, bits - 1))
+        result = (result << bits) | e
+    return result
+
+def unpack_abc(x, bits):
+    """Inverse of `pack_abc`."""
+    if x < 0:
+        return (0, 0, -1)
+    mask = (1 << bits) - 1
+    return (x >> (2 * bits), (x >> bits) & mask, x & mask)
+
+def guard_mask(bits):
+    """Return the mask of the guard bits of the three fields used by `pack_abc`."""
+    guard = 1 << (bits - 1)
+    return (guard << (2 * bits)) | (guard << bits) | guard
+
+
+class PolynomialPool(object):
+    """Node storage for the circular polynomial lists of chapter 2.2.4.
+
+    Nodes are integer indices into the parallel lists COEF, ABC and LINK. Each polynomial is a circular list going
+    through its terms in decreasing order of ABC and back to its special node, whose ABC is (0, 0, -1); the special
+    node is used to refer to the whole polynomial. Deleted nodes are chained from AVAIL and reused before the pool
+    grows, so that repeated in-place operations run in bounded memory.
+
+    If `bits` is given, ABC fields are stored packed into integers (see `pack_abc`) rather than as tuples. Conversion
+    happens in `from_list` and `to_list`, so the list format stays the same.
+    """
+
+    def __init__(self, bits=None):
+        self.coef = []
+        self.abc = []
+        self.link = array('l')
+        # AVAIL stack; -1 is used as the null link
+        self.avail = -1
+        self.bits = bits
+        self.special = (0, 0, -1) if bits is None else -1
+
+    def new_node(self, coef, abc, link=-1):
+        """X <= AVAIL, then set the fields of X."""
+        x = self.avail
+        if x < 0:
+            x = len(self.link)
+            self.coef.append(coef)
+            self.abc.append(abc)
+            self.link.append(link)
+        else:
+            self.avail = self.link[x]
+            self.coef[x] = coef
+            self.abc[x] = abc
+            self.link[x] = link
+        return x
+
+    def free(self, x):
+        """AVAIL <= X"""
+        self.link[x] = self.avail
+        self.avail = x
+
+    def from_list(self, p):
+        """Store a polynomial given as a list of (coef, (a, b, c)) terms ending with (0, (0, 0, -1)).
+
+        :return: the special node of the new circular list
+        """
+        head = self.new_node(0, self.special)
+        last = head
+        for (coef, abc) in p[:-1]:
+            if self.bits is not None:
+                abc = pack_abc(abc, self.bits)
+            node = self.new_node(coef, abc, head)
+            self.link[last] = node
+            last = node
+        self.link[last] = head
+        return head
+
+    def to_list(self, head):
+        """Return the polynomial whose special node is `head` in list form."""
+        result = []
+        x = self.link[head]
+        while x != head:
+            abc = self.abc[x]
+            if self.bits is not None:
+                abc = unpack_abc(abc, self.bits)
+            result.append((self.coef[x], abc))
+            x = self.link[x]
+        return result + [(0, (0, 0, -1))]
+
+    def erase(self, head):
+        """Return all the nodes of a polynomial (special node included) to AVAIL."""
+        x = self.link[head]
+        self.link[head] = self.avail
+        self.avail = x
+
+    def add(self, p, q, m=None):
+        """Algorithm A of chapter 2.2.4: replace polynomial q by q + p, in place. p is unchanged.
+
+        If the node `m` of a term is given, this is algorithm M instead: q is replaced by q + p*m, where every ABC(P)
+        is replaced by ABC(P) + ABC(M) and every COEF(P) by COEF(P) * COEF(M) (except for the special node of p).
+
+        :raises OverflowError: if an exponent of p*m overflows its field (packed exponents only)
+        """
+        coef, abc, link, special = self.coef, self.abc, self.link, self.special
+        packed = self.bits is not None
+        if m is not None:
+            coef_m, abc_m = coef[m], abc[m]
+            if packed:
+                guard = guard_mask(self.bits)
+            else:
+                (a_m, b_m, c_m) = abc_m
+        # step A1
+        P = p
+        Q1 = q
+        Q = link[q]
+        advance = True
+        while True:
+            if advance:
+                # P <- LINK(P), with the substitutions of algorithm M
+                P = link[P]
+                abc_p, coef_p = abc[P], coef[P]
+                if m is not None and abc_p != special:
+                    if packed:
+                        abc_p += abc_m
+                        if abc_p & guard:
+                            raise OverflowError("Exponent overflow in packed monomial")
+                    else:
+                        (a, b, c) = abc_p
+                        abc_p = (a + a_m, b + b_m, c + c_m)
+                    coef_p *= coef_m
+                advance = False
+            abc_q = abc[Q]
+            if abc_p < abc_q:
+                # step A2
+                Q1 = Q
+                Q = link[Q]
+                continue
+            if abc_p == abc_q:
+                # step A3
+                if abc_p == special:
+                    return q
+                coef[Q] += coef_p
+                if coef[Q] == 0:
+                    # step A4 : delete the term
+                    Q2 = Q
+                    Q = link[Q]
+                    link[Q1] = Q
+                    self.free(Q2)
+                else:
+                    Q1 = Q
+                    Q = link[Q]
+            else:
+                # step A5 : insert a new term
+                Q2 = self.new_node(coef_p, abc_p, Q)
+                link[Q1] = Q2
+                Q1 = Q2
+            advance = True
+
+    def multiply_add(self, p, m, q):
+        """Algorithm M of chapter 2.2.4: replace polynomial q by q + p*m, in place. p and m are unchanged."""
+        # step M1
+        M = self.link[m]
+        # step M2 : loop until the special node of m is reached
+        while self.abc[M] != self.special:
+            self.add(p, q, M)
+            M = self.link[M]
+        return q
+
+
+def polynomial_addition(p, q, bits=None):
     """Implement algorithm A of chapter 2.2.4.
 
-    This algorithm does not actually make use of circular lists, as each list is traversed only once.
-    Nonetheless, the implementation uses the `cycle` method from itertools lists to emulate a circular list (this frees
-    us from the temptation to test for the end of the list to terminate the algorithm, and prepares us for the
-    multiplication algorithm).
     Each polynomial is described as a list of nested tuples of the form (coef, (a, b, c)).
     The last element of each polynomial is always (0, (0, 0, -1)).
+    Both polynomials are loaded into a `PolynomialPool`, where q is updated in place as in the original algorithm.
 
     :param p: the first polynomial to add
     :param q: the second polynomial to add
-    :return: the sum of p and q as a new list (note that this is different from the original algorithm
-    which adds to q in place.)
+    :param bits: if given, pack exponents into integers with fields of that many bits (see `pack_abc`)
+    :return: the sum of p and q as a new list
     """
-    result = []
-    circular_p = itertools.cycle(p)
-    circular_q = itertools.cycle(q)
-    # step A1. P and Q are used to denote the value of the current element of p and q
-    P = next(circular_p)
-    Q = next(circular_q)
-    special = (0, 0, -1)
-
-    def coef(X):
-        return X[0]
-
-    def abc(X):
-        return X[1]
-    # loop over p and q while the special node hasn't been reached (exit case of step A3)
-    while abc(P) != special or abc(Q) != special :
-        if abc(P) == abc(Q):
-            # step A3
-            c = coef(P) + coef(Q)
-            if c != 0:
-                result.append((c, abc(P)))
-            P = next(circular_p)
-            Q = next(circular_q)
-        while abc(P) < abc(Q):
-            # step A2
-            result.append(Q)
-            Q = next(circular_q)
-        while abc(P) > abc(Q):
-            # step A5
-            result.append(P)
-            P = next(circular_p)
-
-    return result + [Q]
-
-def polynomial_multiplication(p, m):
+    pool = PolynomialPool(bits)
+    P = pool.from_list(p)
+    Q = pool.from_list(q)
+    return pool.to_list(pool.add(P, Q))
+
+def polynomial_multiplication(p, m, bits=None):
     """Implement algorithm M of chapter 2.2.4.
 
     As for addition, each polynomial is described as a list of nested tuples of the form (coef, (a, b, c)).
     The last element of each polynomial is always (0, (0, 0, -1)).
+    The product is accumulated in place into an initially zero polynomial of a `PolynomialPool`.
 
     :param p: first polynomial to multiply
     :param m: second polynomial to multiply
-    :return: p*m as a new list (note that this is different from the original algorithm)
+    :param bits: if given, pack exponents into integers with fields of that many bits (see `pack_abc`)
+    :return: p*m as a new list
+    :raises OverflowError: if an exponent of the product does not fit in `bits` - 1 bits
     """
-    special = (0, 0, -1)
-    result = []
-    circular_p = itertools.cycle(p)
-    def coef(X):
-        return X[0]
-
-    def abc(X):
-        return X[1]
-
-    def add_abc(X, Y):
-        a = abc(X)
-        b = abc(Y)
-        return tuple([e1 + e2 for (e1, e2) in zip(a, b)])
-
-    # loop for step M1/M2
-    for M in m:
-        if abc(M) == (0, 0, -1):
-            return result + [(0, special)]
-
-        # initialize P and Q.
-        P = next(circular_p)
-        # poor man's version of circular lists : take the previous iteration's result, use it as a new list and store
-        circular_q = iter(result.copy() + [(0, special)])
-        Q = next(circular_q)
-        result = []
-        # same algorithm as for addition with a few changes
-        while abc(P) != special or abc(Q) != special:
-            if add_abc(P, M) == abc(Q):
-                # step A3/M2. No need to check that abc(P) > -1 as this is always true in this branch
-                c = coef(P)*coef(M) + coef(Q)
+    pool = PolynomialPool(bits)
+    P = pool.from_list(p)
+    M = pool.from_list(m)
+    Q = pool.from_list([(0, (0, 0, -1))])
+    return pool.to_list(pool.multiply_add(P, M, Q))
+
+
+class SparsePolynomial(object):
+    """Polynomial in x, y, z stored as a dict mapping exponents (a, b, c) to non-zero coefficients.
+
+    This trades the ordered lists of algorithms A and M for hashing: adding a term costs O(1) whatever the size of the
+    polynomial, so a product of polynomials with |p| and |m| terms takes O(|p|.|m|) time. The polynomials can be
+    converted to and from the list format used by `polynomial_addition` and `polynomial_multiplication`.
+    """
+    __slots__ = ('terms',)
+
+    def __init__(self, terms=None):
+        self.terms = {}
+        if terms is not None:
+            for (abc, coef) in terms.items():
+                self.add_term(coef, abc)
+
+    @classmethod
+    def from_list(cls, p):
+        """Build a polynomial from a list of (coef, (a, b, c)) terms, ending with the (0, (0, 0, -1)) special node."""
+        result = cls()
+        for (coef, abc) in p:
+            if abc != (0, 0, -1):
+                result.add_term(coef, abc)
+        return result
+
+    def to_list(self):
+        """Return the polynomial as a list of (coef, (a, b, c)) terms in decreasing order of (a, b, c), ending with the
+        special node."""
+        return [(coef, abc) for (abc, coef) in sorted(self.terms.items(), reverse=True)] + [(0, (0, 0, -1))]
+
+    def add_term(self, coef, abc):
+        """Add coef * x^a y^b z^c to the polynomial in place."""
+        c = self.terms.get(abc, 0) + coef
+        if c != 0:
+            self.terms[abc] = c
+        elif abc in self.terms:
+            del self.terms[abc]
+
+    def add_product(self, p, m):
+        """Add the product p*m to the polynomial in place, as algorithm M does (q <- q + p*m)."""
+        terms = self.terms
+        for ((a2, b2, c2), coef2) in m.terms.items():
+            for ((a1, b1, c1), coef1) in p.terms.items():
+                abc = (a1 + a2, b1 + b2, c1 + c2)
+                c = terms.get(abc, 0) + coef1 * coef2
                 if c != 0:
-                    result.append((c, abc(Q)))
-                P = next(circular_p)
-                Q = next(circular_q)
-            if abc(P) > special:
-                while add_abc(P, M) < abc(Q):
-                    # step A2. # The while condition is probably not enough to cover the M2 check
-                    result.append(Q)
-                    Q = next(circular_q)
-            else:
-                while abc(Q) > special:
-                    result.append(Q)
-                    Q = next(circular_q)
-            while abc(P) > special and add_abc(P, M) > abc(Q):
-                # step A5
-                X = (coef(P)*coef(M), add_abc(P, M))
-                result.append(X)
-                P = next(circular_p)
-
-        #result.append((0, special))
+                    terms[abc] = c
+                else:
+                    terms.pop(abc, None)
+        return self
+
+    def __iadd__(self, other):
+        for (abc, coef) in other.terms.items():
+            self.add_term(coef, abc)
+        return self
+
+    def __add__(self, other):
+        result = SparsePolynomial(self.terms)
+        result += other
+        return result
+
+    def __mul__(self, other):
+        return SparsePolynomial().add_product(self, other)
+
+    def __eq__(self, other):
+        if not isinstance(other, SparsePolynomial):
+            return NotImplemented
+        return self.terms == other.terms
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __repr__(self):
+        return 'SparsePolynomial(%r)' % self.terms
 
 
 if __name__ == '__main__':
@@ -2,6 +2,8 @@
 
 """
 
+from array import array
+
 class DataElement(object):
     """ Simple storage class to represent a Data Table row
 
@@ -23,20 +25,45 @@ class DataElement(object):
         return ', '.join(items)
 
 
-def build_data_table(input_sequence):
-    """ Implementation of algorithm A """
-    data_table = {}
-    symbol_table = {}
-    # the stack will hold "pointers" to data elements (key in the data_table corresponding to the DataElement object)
-    stack = [(0, None)]
-    # A2 loop
-    for (L, P) in input_sequence:
+class DataTableBuilder(object):
+    """ Incremental implementation of algorithm A
+
+    Entries can be added one at a time, in chunks, or read from the lines of a file, and the tables can be queried at
+    any time. Besides the tables themselves, the only working state is the stack of the entries which are still open.
+    A top-level group (an entry with no parent, and its descendants) is complete as soon as the next top-level entry
+    is read. Completed groups can be removed from the data table with `pop_groups`, so that memory usage stays close
+    to the size of one group; the symbol table is kept whole since later entries are linked to earlier ones with the
+    same name.
+
+    Keys are the name followed by the level (e.g. `NAME5`). The same key can come up again, for instance when a field
+    name is used at the same level in two records; the later entries then get a numbered key (`NAME5#2`, `NAME5#3`...)
+    so that no entry is overwritten. The number of times each key has been issued is the only other state kept.
+    """
+
+    def __init__(self):
+        self.symbol_table = {}
+        self.data_table = {}
+        self.key_counts = {}
+        # the stack will hold "pointers" to data elements (key in the data_table corresponding to the DataElement object)
+        self.stack = [(0, None)]
+        # keys of the entries of the current top-level group, and of the completed groups not yet popped
+        self.group = []
+        self.completed = []
+
+    def add(self, L, P):
+        """ Steps A3-A6 for one entry of level L and name P """
+        data_table = self.data_table
+        stack = self.stack
         # A3
         # PREV(Q) <- LINK(P)
-        prev = symbol_table.get(P, None)
+        prev = self.symbol_table.get(P, None)
         # LINK(P) <- Q
         link = "%s%d" % (P, L)
-        symbol_table[P] = link
+        count = self.key_counts.get(link, 0) + 1
+        self.key_counts[link] = count
+        if count > 1:
+            link = "%s#%d" % (link, count)
+        self.symbol_table[P] = link
         # add to symbol table
         Q = DataElement(name=P, prev=prev, key=link)
         data_table[link] = Q
@@ -62,8 +89,272 @@ def build_data_table(input_sequence):
         Q.child = None
         Q.sib = None
         stack.append((L, Q.key))
-    return symbol_table, data_table
+        if P1 is None and len(self.group) > 0:
+            # a new top-level group starts: the previous one is complete
+            self.completed.append(self.group)
+            self.group = []
+        self.group.append(Q.key)
+        return Q
+
+    def feed(self, input_sequence):
+        """ Add a sequence (or any iterable) of (level, name) pairs """
+        for (L, P) in input_sequence:
+            self.add(L, P)
+        return self
+
+    def feed_lines(self, lines):
+        """ Add entries read from lines of the form `level name ...` (e.g. `05 CUSTOMER-NAME PIC X(20).`)
+
+        Lines which do not start with a level number (blank lines, comments) are skipped, and a trailing period is
+        removed from the name.
+        """
+        for line in lines:
+            fields = line.split(None, 2)
+            if len(fields) >= 2 and fields[0].isdigit():
+                self.add(int(fields[0]), fields[1].rstrip('.'))
+        return self
+
+    def pop_groups(self):
+        """ Remove the completed top-level groups from the data table and return them
+
+        :return: a list with one dict {key: DataElement} per group, in input order
+        """
+        groups = [{key: self.data_table.pop(key) for key in group} for group in self.completed]
+        self.completed = []
+        return groups
+
+    def finish(self):
+        """ Mark the end of the input: the last group is complete """
+        if len(self.group) > 0:
+            self.completed.append(self.group)
+            self.group = []
+        self.stack = [(0, None)]
+        return self
+
+
+def build_data_table(input_sequence):
+    """ Implementation of algorithm A """
+    builder = DataTableBuilder().feed(input_sequence)
+    return builder.symbol_table, builder.data_table
+
+
+def parse_reference(reference):
+    """Split a qualified reference such as `C OF B OF A` into its names (`['C', 'B', 'A']`).
+
+    Lists and tuples of names are returned unchanged. As in COBOL, `IN` can be used instead of `OF`.
+    """
+    if isinstance(reference, str):
+        return [name for name in reference.split() if name.upper() not in ('OF', 'IN')]
+    return reference
+
+
+def _qualifies(data_table, P, qualifiers):
+    """Check that the ancestors of entry P include the given names, in order from the innermost outwards."""
+    k = 0
+    S = data_table[P].parent
+    while k < len(qualifiers) and S is not None:
+        if data_table[S].name == qualifiers[k]:
+            k += 1
+        S = data_table[S].parent
+    return k == len(qualifiers)
+
+
+def qualified_reference(symbol_table, data_table, reference):
+    """ Implementation of algorithm B: find the entry designated by a reference P0 OF P1 OF ... OF Pn
+
+    :param symbol_table: the symbol table built by `build_data_table`
+    :param data_table: the data table built by `build_data_table`
+    :param reference: the reference, as a string or a list of names [P0, P1, ..., Pn]
+    :return: the key of the matching entry in the data table, or None if there is none
+    :raises ValueError: if several entries match the reference, or if the PREV links of the table form a loop
+    """
+    names = parse_reference(reference)
+    # B1 : P <- LINK(P0), Q <- None
+    P = symbol_table.get(names[0])
+    Q = None
+    # keys already examined, so that a corrupted table cannot make the search loop forever
+    seen = set()
+    # B2 : loop over the entries named P0, going through the PREV links
+    while P is not None:
+        if P in seen:
+            raise ValueError("The PREV links of %s form a loop at %s" % (names[0], P))
+        seen.add(P)
+        # B3-B5 : check the qualifiers against the ancestors of P
+        if _qualifies(data_table, P, names[1:]):
+            if Q is not None:
+                raise ValueError("Ambiguous reference %s" % ' OF '.join(names))
+            Q = P
+        # B6
+        P = data_table[P].prev
+    return Q
+
+
+class ReferenceIndex(object):
+    """Index of a data table built by `build_data_table`, for high volume qualified reference lookups.
 
+    For every entry Q and every ancestor A of Q, Q is recorded under the pair (NAME(Q), NAME(A)). A reference
+    P0 OF P1 OF ... OF Pn then only needs to examine the entries filed under the least common of the pairs (P0, Pk),
+    instead of all the entries named P0: in practice, this is close to O(n).
+    """
+
+    def __init__(self, symbol_table, data_table):
+        self.symbol_table = symbol_table
+        self.data_table = data_table
+        self.index = {}
+        for (key, Q) in data_table.items():
+            seen = set()
+            S = Q.parent
+            while S is not None:
+                A = data_table[S]
+                if A.name not in seen:
+                    seen.add(A.name)
+                    self.index.setdefault((Q.name, A.name), []).append(key)
+                S = A.parent
+
+    def resolve(self, reference):
+        """Same as `qualified_reference`, using the index."""
+        names = parse_reference(reference)
+        if len(names) == 1:
+            return qualified_reference(self.symbol_table, self.data_table, names)
+        candidates = min((self.index.get((names[0], name), []) for name in names[1:]), key=len)
+        Q = None
+        for P in candidates:
+            if _qualifies(self.data_table, P, names[1:]):
+                if Q is not None:
+                    raise ValueError("Ambiguous reference %s" % ' OF '.join(names))
+                Q = P
+        return Q
+
+    def resolve_all(self, references):
+        """Resolve a batch of references against the table.
+
+        :return: the list of matching keys (None for references without a match)
+        :raises ValueError: if one of the references is ambiguous
+        """
+        return [self.resolve(reference) for reference in references]
+
+
+def move_corresponding(data_table, alpha, beta):
+    """ Implementation of algorithm C: find the pairs of entries concerned by MOVE CORRESPONDING alpha TO beta
+
+    A pair (P, Q) is output when P is in the group alpha, Q in the group beta, the names on the path from alpha down
+    to P are the same as those from beta down to Q, and at least one of P and Q is elementary (has no children).
+
+    :param data_table: the data table built by `build_data_table`
+    :param alpha: the key of the source group
+    :param beta: the key of the destination group
+    :return: the list of pairs of keys, in the order of the entries of alpha
+    """
+    result = []
+    # C1 : pairs of entries whose qualifications agree, still to be examined (top of the stack is examined first)
+    stack = [(alpha, beta)]
+    while len(stack) > 0:
+        (P, Q) = stack.pop()
+        # C2 : elementary items are moved, groups are explored
+        if data_table[P].child is None or data_table[Q].child is None:
+            result.append((P, Q))
+            continue
+        # C3-C4 : for each child of P, find a child of Q with the same name
+        children_of_Q = {}
+        Q1 = data_table[Q].child
+        while Q1 is not None:
+            children_of_Q.setdefault(data_table[Q1].name, Q1)
+            Q1 = data_table[Q1].sib
+        pairs = []
+        P1 = data_table[P].child
+        while P1 is not None:
+            if data_table[P1].name in children_of_Q:
+                pairs.append((P1, children_of_Q[data_table[P1].name]))
+            # C5 : move to the next sibling of P
+            P1 = data_table[P1].sib
+        stack.extend(reversed(pairs))
+    return result
+
+
+class DataArrays(object):
+    """Data table of algorithm A stored in parallel integer arrays.
+
+    Entries are numbered from 1 in input order, and 0 stands for the null link. Entry i has fields PREV[i],
+    PARENT[i], NAME[i], CHILD[i] and SIB[i], held in the arrays `prev`, `parent`, `name`, `child` and `sib`.
+    Names are interned: NAME[i] is an index in `names`, and the symbol table LINK is an array indexed by name,
+    pointing to the last entry with that name. Entry numbers play the part of the keys of `build_data_table`,
+    without the `#n` suffix these need when the same name appears twice at the same level.
+    """
+
+    def __init__(self):
+        self.prev = array('l', [0])
+        self.parent = array('l', [0])
+        self.name = array('l', [0])
+        self.child = array('l', [0])
+        self.sib = array('l', [0])
+        self.link = array('l')
+        self.names = []
+        self.name_ids = {}
+
+    def __len__(self):
+        return len(self.name) - 1
+
+    def name_of(self, i):
+        return self.names[self.name[i]]
+
+    def lookup(self, P):
+        """Return the last entry named P (LINK(P)), or 0 if there is none."""
+        n = self.name_ids.get(P)
+        return 0 if n is None else self.link[n]
+
+    def element(self, i):
+        """Return entry i as a `DataElement`, with entry numbers as keys."""
+        return DataElement(prev=self.prev[i] or None, parent=self.parent[i] or None, name=self.name_of(i),
+                           child=self.child[i] or None, sib=self.sib[i] or None, key=i)
+
+
+def build_data_arrays(input_sequence):
+    """ Implementation of algorithm A, building a `DataArrays` table """
+    table = DataArrays()
+    prev, parent, name, child, sib, link = table.prev, table.parent, table.name, table.child, table.sib, table.link
+    name_ids = table.name_ids
+    # the stack holds levels and entry numbers; the sentinel at the bottom has level 0 and entry 0
+    levels = [0]
+    entries = [0]
+    Q = 0
+    # A2 loop
+    for (L, P) in input_sequence:
+        # A3
+        Q += 1
+        n = name_ids.get(P)
+        if n is None:
+            n = name_ids[P] = len(table.names)
+            table.names.append(P)
+            link.append(0)
+        # PREV(Q) <- LINK(P), LINK(P) <- Q
+        prev.append(link[n])
+        link[n] = Q
+        name.append(n)
+        child.append(0)
+        sib.append(0)
+        L1 = levels[-1]
+        if L1 < L:
+            # step A4
+            child[entries[-1]] = Q
+        else:
+            # step A5
+            while L1 > L:
+                levels.pop()
+                entries.pop()
+                L1 = levels[-1]
+            if L1 < L:
+                raise ValueError("Mixed numbers on the same level")
+            # L1 == L. Set sibling
+            sib[entries[-1]] = Q
+            levels.pop()
+            entries.pop()
+        # step A6
+        parent.append(entries[-1])
+        levels.append(L)
+        entries.append(Q)
+    # entry 0 is not a real entry: clear the child link set by the first top-level entry
+    child[0] = 0
+    return table
 
 
 
@@ -0,0 +1,235 @@
+"""Binary storage for the tables built by `multilink.build_data_table`.
+
+The file starts with a 24-byte little-endian header:
+
+* magic number `b'DTAB'`
+* format version (unsigned byte)
+* byte order of the arrays below (`b'<'` or `b'>'`)
+* two padding bytes
+* number of entries n, number of symbols s, number of strings m and size of the string pool in bytes (unsigned 32-bit
+  integers)
+
+followed by unsigned 32-bit arrays and the string pool:
+
+* the entries: n+1 rows of 6 fields PREV, PARENT, CHILD, SIB, NAME, KEY. Links are entry numbers (entries are
+  numbered from 1 in input order, 0 is the null link); NAME and KEY are string numbers. Row 0 is unused.
+* the key index: the n entry numbers, sorted by key
+* the symbol table: s pairs (name, entry number), sorted by name
+* the string offsets: m+1 offsets into the pool (string i is pool[offsets[i]:offsets[i + 1]], UTF-8 encoded)
+* the string pool
+
+Loaded tables are memory-mapped: nothing is decoded up front, so opening a table is cheap whatever its size and
+processes opening the same file share its pages. Rows are read through `ElementView` objects created on access. The
+loaded table and its `symbol_table` behave as the dicts returned by `build_data_table`, so they can be passed to
+`qualified_reference` or `ReferenceIndex` as they are.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from multilink import DataElement
+
+MAGIC = b'DTAB'
+VERSION = 1
+HEADER = struct.Struct('<4sBc2xIIII')
+BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+FIELDS = ('prev', 'parent', 'child', 'sib', 'name', 'key')
+WIDTH = len(FIELDS)
+PREV, PARENT, CHILD, SIB, NAME, KEY = range(WIDTH)
+
+
+def write_data_table(path, symbol_table, data_table):
+    """Write the tables returned by `build_data_table` to `path`.
+
+    :param symbol_table: dict {name: key of the last entry with that name}
+    :param data_table: dict {key: DataElement}, in input order
+    """
+    numbers = {key: i for (i, key) in enumerate(data_table, 1)}
+    numbers[None] = 0
+    strings = {}
+
+    def string(s):
+        if s not in strings:
+            strings[s] = len(strings)
+        return strings[s]
+
+    entries = array('I', [0] * WIDTH)
+    for (key, Q) in data_table.items():
+        entries.extend((numbers[Q.prev], numbers[Q.parent], numbers[Q.child], numbers[Q.sib], string(Q.name),
+                        string(key)))
+    keys = [None] + [key.encode() for key in data_table]
+    key_index = array('I', sorted(range(1, len(keys)), key=keys.__getitem__))
+    symbols = array('I')
+    for name in sorted(symbol_table, key=lambda s: s.encode()):
+        symbols.extend((string(name), numbers[symbol_table[name]]))
+    encoded = [s.encode() for s in strings]
+    offsets = array('I', [0])
+    for s in encoded:
+        offsets.append(offsets[-1] + len(s))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, len(data_table), len(symbol_table), len(encoded),
+                            offsets[-1]))
+        for a in (entries, key_index, symbols, offsets):
+            f.write(a.tobytes())
+        f.write(b''.join(encoded))
+
+
+class ElementView(object):
+    """A row of a `MappedDataTable`, with the same attributes as `DataElement` (links are keys, or None)."""
+    __slots__ = ('_table', '_i')
+
+    def __init__(self, table, i):
+        self._table = table
+        self._i = i
+
+    def _link(self, field):
+        return self._table.key_of(self._table.entries[WIDTH * self._i + field])
+
+    prev = property(lambda self: self._link(PREV))
+    parent = property(lambda self: self._link(PARENT))
+    child = property(lambda self: self._link(CHILD))
+    sib = property(lambda self: self._link(SIB))
+    name = property(lambda self: self._table.string(self._table.entries[WIDTH * self._i + NAME]))
+    key = property(lambda self: self._table.key_of(self._i))
+
+    def to_element(self):
+        """Return a `DataElement` holding the same values."""
+        return DataElement(**{field: getattr(self, field) for field in FIELDS})
+
+    def __str__(self):
+        return str(self.key)
+
+    def __repr__(self):
+        return ', '.join('{}={}'.format(k, getattr(self, k)) for k in DataElement.__slots__)
+
+
+class MappedDataTable(Mapping):
+    """A data table mapped from a file, usable as a read-only dict {key: element}.
+
+    Keys are found by binary search in the key index; iteration follows the input order.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            self._mmap.close()
+            raise ValueError("%s is not a data table file" % path)
+        magic, version, byte_order, n, s, m, pool_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError("%s is not a data table file" % path)
+        if byte_order != BYTE_ORDER:
+            self._mmap.close()
+            raise ValueError("Unsupported byte order in %s" % path)
+        if len(self._mmap) < HEADER.size + 4 * ((n + 1) * WIDTH + n + 2 * s + m + 1) + pool_size:
+            self._mmap.close()
+            raise ValueError("%s is truncated" % path)
+        self.n = n
+        view = memoryview(self._mmap)
+        sections = []
+        start = HEADER.size
+        for count in ((n + 1) * WIDTH, n, 2 * s, m + 1):
+            sections.append(view[start:start + 4 * count].cast('I'))
+            start += 4 * count
+        (self.entries, self.key_index, self.symbols, self.offsets) = sections
+        self.pool = view[start:start + pool_size]
+        view.release()
+        self.symbol_table = MappedSymbols(self)
+
+    def string(self, i):
+        return str(self.pool[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def _string_bytes(self, i):
+        return self.pool[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def key_of(self, i):
+        """Return the key of entry number i (None for the null link 0)."""
+        return self.string(self.entries[WIDTH * i + KEY]) if i else None
+
+    def number(self, key):
+        """Return the entry number of `key`, or 0 if there is no such entry."""
+        target = key.encode()
+        (lo, hi) = (0, self.n)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = self.key_index[mid]
+            if self._string_bytes(self.entries[WIDTH * i + KEY]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n:
+            i = self.key_index[lo]
+            if self._string_bytes(self.entries[WIDTH * i + KEY]) == target:
+                return i
+        return 0
+
+    def lookup(self, P):
+        """Return the key of the last entry named P (as `symbol_table.get(P)`), or None."""
+        target = P.encode()
+        (lo, hi) = (0, len(self.symbols) // 2)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string_bytes(self.symbols[2 * mid]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if 2 * lo < len(self.symbols) and self._string_bytes(self.symbols[2 * lo]) == target:
+            return self.key_of(self.symbols[2 * lo + 1])
+        return None
+
+    def __getitem__(self, key):
+        i = self.number(key)
+        if i == 0:
+            raise KeyError(key)
+        return ElementView(self, i)
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        for i in range(1, self.n + 1):
+            yield self.key_of(i)
+
+    def close(self):
+        for section in (self.entries, self.key_index, self.symbols, self.offsets, self.pool):
+            section.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MappedSymbols(Mapping):
+    """The symbol table of a `MappedDataTable`, as a read-only dict {name: key}."""
+
+    def __init__(self, table):
+        self._table = table
+
+    def __getitem__(self, P):
+        key = self._table.lookup(P)
+        if key is None:
+            raise KeyError(P)
+        return key
+
+    def __len__(self):
+        return len(self._table.symbols) // 2
+
+    def __iter__(self):
+        symbols = self._table.symbols
+        for j in range(0, len(symbols), 2):
+            yield self._table.string(symbols[j])
+
+
+def load_data_table(path):
+    """Memory-map the data table stored in `path`.
+
+    :return: a `MappedDataTable`; use it as a context manager or call `close` when done
+    """
+    return MappedDataTable(path)
@@ -0,0 +1,135 @@
+"""Memory-mapped storage for permutation tables too large to be held as Python objects.
+
+A permutation table (see `permutations.cycles_to_table`) is stored as a fixed-width integer array preceded by a
+16-byte header:
+
+* magic number `b'PERM'`
+* format version (unsigned byte)
+* byte order of the array (`b'<'` or `b'>'`)
+* width of each entry in bytes (unsigned short, 4 or 8)
+* number of points n (unsigned 64-bit integer)
+
+followed by the n+1 entries of the table (entry 0 is always 0, as in the table form used everywhere else).
+The header itself is always little-endian.
+
+Loaded tables are memory-mapped, so several processes opening the same file share its pages, and the functions
+below stream over them chunk by chunk to keep memory usage bounded.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b'PERM'
+VERSION = 1
+HEADER = struct.Struct('<4sBcHQ')
+TYPECODES = {4: 'i', 8: 'q'}
+BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+CHUNK_SIZE = 1 << 16
+
+
+class MappedTable(object):
+    """A permutation table mapped from a file.
+
+    `table` is a memoryview of the entries which can be indexed and sliced like the lists used by `permutations`;
+    it is writable if the file was opened with `writable=True`.
+    """
+
+    def __init__(self, path, writable=False):
+        with open(path, 'r+b' if writable else 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            self._mmap.close()
+            raise ValueError("%s is not a permutation file" % path)
+        magic, version, byte_order, itemsize, n = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError("%s is not a permutation file" % path)
+        if byte_order != BYTE_ORDER or itemsize not in TYPECODES:
+            self._mmap.close()
+            raise ValueError("Unsupported table layout in %s" % path)
+        if len(self._mmap) < HEADER.size + (n + 1) * itemsize:
+            self._mmap.close()
+            raise ValueError("%s is truncated" % path)
+        self.n = n
+        self.typecode = TYPECODES[itemsize]
+        self.table = memoryview(self._mmap)[HEADER.size:HEADER.size + (n + 1) * itemsize].cast(self.typecode)
+
+    def __len__(self):
+        return len(self.table)
+
+    def close(self):
+        self.table.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def create_table(path, n, itemsize=8):
+    """Create a file holding the identity permutation on n points and return it mapped for writing.
+
+    :param path: the file to create (overwritten if it exists)
+    :param n: the number of points
+    :param itemsize: the width of each entry in bytes (4 or 8)
+    :return: a writable `MappedTable`
+    """
+    if itemsize not in TYPECODES:
+        raise ValueError("Entries must be 4 or 8 bytes wide")
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, itemsize, n))
+        for lo in range(0, n + 1, CHUNK_SIZE):
+            f.write(array(TYPECODES[itemsize], range(lo, min(lo + CHUNK_SIZE, n + 1))).tobytes())
+    return MappedTable(path, writable=True)
+
+
+def write_table(path, table, itemsize=8):
+    """Write a permutation table (any sequence of integers with table[0] = 0) to `path`."""
+    n = len(table) - 1
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, itemsize, n))
+        for lo in range(0, n + 1, CHUNK_SIZE):
+            f.write(array(TYPECODES[itemsize], table[lo:lo + CHUNK_SIZE]).tobytes())
+
+
+def load_table(path, writable=False):
+    """Memory-map the permutation table stored in `path`.
+
+    :return: a `MappedTable`; use it as a context manager or call `close` when done
+    """
+    return MappedTable(path, writable)
+
+
+def inverse_file(src, dst, chunk_size=CHUNK_SIZE):
+    """Write the inverse of the permutation stored in `src` to `dst`, streaming over `src` in chunks.
+
+    Algorithm I cannot be used here as it works in place with tagged (negated) entries; instead, the inverse is
+    scattered into a new file: out[T[i]] = i.
+    """
+    with load_table(src) as T, create_table(dst, T.n, T.table.itemsize) as out:
+        table = T.table
+        result = out.table
+        for lo in range(1, len(table), chunk_size):
+            for i, j in enumerate(table[lo:lo + chunk_size].tolist(), lo):
+                result[j] = i
+
+
+def product_files(src_s, src_t, dst, chunk_size=CHUNK_SIZE):
+    """Write the product ST (S applied first, then T) of the permutations stored in `src_s` and `src_t` to `dst`.
+
+    Both permutations must be on the same number of points. `src_s` is read sequentially in chunks, and each chunk is
+    gathered through the mapped `src_t`.
+    """
+    with load_table(src_s) as S, load_table(src_t) as T:
+        if S.n != T.n:
+            raise ValueError("Permutations must be on the same number of points")
+        with create_table(dst, S.n, S.table.itemsize) as out:
+            gather = T.table.__getitem__
+            for lo in range(1, len(S.table), chunk_size):
+                chunk = S.table[lo:lo + chunk_size]
+                out.table[lo:lo + len(chunk)] = array(out.typecode, map(gather, chunk.tolist()))
+                chunk.release()
@@ -1,12 +1,25 @@
 """Implementation of the permutation algorithms (chapter 1.3.3).
 To stick to the original text, a permutation is represented as a list of tuples of numbers from 1 to n.
 So for instance `[(1, 2, 3),(4,6)]` corresponds to (a b c)(d f) using Knuth's notation.
+For large permutations, the `Permutation` class stores the table form in a contiguous integer array instead.
 """
 
-def permutation_product_A(perms):
-    """Implement algorithm B of chapter 1.3.3
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from math import lcm
+from multiprocessing import Pool
+
+
+def permutation_product_A(perms, indexed=False):
+    """Implement algorithm A of chapter 1.3.3
+
+    The literal version rescans the formula from the left for every symbol it outputs. With `indexed=True`, the
+    positions of every symbol are computed once, so that step A4 jumps directly to the next occurrence of CURRENT and
+    step A2 resumes from the last untagged element. Both versions return the same result.
 
     :param perms: the list of permutations (themselves a list of cycles) to multiply
+    :param indexed: use the indexed version of steps A2 and A4
     :return: The product of the permutations in normalized form
     """
     if len(perms) == 0:
@@ -20,6 +33,8 @@ def permutation_product_A(perms):
     for cycle in cycles:
         symbols.extend(cycle)
         symbols.append(- cycle[0])
+    if indexed:
+        return _product_A_indexed(symbols)
     result = []
     n = len(symbols)
     closed = True
@@ -60,6 +75,49 @@ def permutation_product_A(perms):
                 result.append(normalized_tuple(current_cycle))
             closed = True
 
+def _product_A_indexed(symbols):
+    """Steps A2-A6 of algorithm A, using an index of the positions of each symbol.
+
+    :param symbols: the formula as built by step A1 in `permutation_product_A`
+    :return: The product in normalized form
+    """
+    n = len(symbols)
+    positions = {}
+    for idx, symbol in enumerate(symbols):
+        positions.setdefault(abs(symbol), []).append(idx)
+    result = []
+    first = 0
+    while True:
+        # step A2 : tagged elements never become untagged, so the search resumes where the previous one stopped
+        while first < n and symbols[first] < 0:
+            first += 1
+        if first == n:
+            return sorted(result)
+        start = symbols[first]
+        current_cycle = [start]
+        symbols[first] = -start
+        # step A3
+        current = abs(symbols[first + 1])
+        idx = first + 2
+        while True:
+            # step A4 : jump from one occurrence of current to the next
+            occurrences = positions[current]
+            k = bisect_left(occurrences, idx)
+            if k < len(occurrences):
+                idx = occurrences[k]
+                symbols[idx] = - abs(symbols[idx])
+                current = abs(symbols[idx + 1])
+                idx += 2
+            elif current != start:
+                # step A5
+                current_cycle.append(current)
+                idx = 0
+            else:
+                # step A6
+                if len(current_cycle) > 1:
+                    result.append(normalized_tuple(current_cycle))
+                break
+
 def permutation_product_B(perms):
     """Implement algorithm B of chapter 1.3.3
 
@@ -90,6 +148,74 @@ def permutation_product_B(perms):
     # end of main algorithm. Now translate the result in cycle form.
     return table_to_cycles(T)
 
+def permutation_product_batch(chains, n=None, tables=False, processes=None):
+    """Multiply many independent chains of permutations on the same set of points.
+
+    Each chain uses the same input format as `permutation_product_B`. The chain is cut into factors, each made of
+    consecutive disjoint cycles (usually one factor per permutation), and every distinct factor is translated to table
+    form only once, by writing all its cycles into a single copy of the identity. Each chain is then composed from left
+    to right with one gather per factor, so a factor costs O(n) whatever its number of cycles.
+
+    :param chains: an iterable of chains, each being a list of cycles or a list of permutations
+    :param n: the number of points. Defaults to the largest element found in the chains.
+    :param tables: if True, return each product as a permutation table (an `array`) rather than in cycle form
+    :param processes: if given, spread the chains over a pool of that many worker processes
+    :return: the list of products, in the same order as `chains`
+    """
+    chains = [list(_factors(chain)) for chain in chains]
+    if n is None:
+        n = max([max(cycle) for chain in chains for factor in chain for cycle in factor], default=0)
+    if processes is None or processes <= 1 or len(chains) <= 1:
+        return _batch_product(chains, n, tables)
+    # one contiguous slice of chains per worker, so that each worker can share factor tables between its chains
+    size = -(-len(chains) // processes)
+    slices = [chains[i:i + size] for i in range(0, len(chains), size)]
+    with Pool(processes) as pool:
+        results = pool.starmap(_batch_product, [(s, n, tables) for s in slices])
+    return [product for result in results for product in result]
+
+def _factors(chain):
+    """Cut a chain (a list of cycles or a list of permutations) into runs of consecutive disjoint cycles.
+
+    Disjoint cycles commute, so the product of a run is the permutation obtained by writing all its cycles into the
+    same table.
+
+    :return: a generator yielding each run as a tuple of cycles
+    """
+    perms = chain if len(chain) > 0 and isinstance(chain[0], list) else [chain]
+    for perm in perms:
+        factor = []
+        seen = set()
+        for cycle in perm:
+            if not seen.isdisjoint(cycle):
+                yield tuple(factor)
+                factor = []
+                seen = set()
+            factor.append(tuple(cycle))
+            seen.update(cycle)
+        if len(factor) > 0:
+            yield tuple(factor)
+
+def _batch_product(chains, n, tables):
+    """Serial kernel of `permutation_product_batch`; each chain is a list of factors as produced by `_factors`."""
+    tables_by_factor = {}
+    identity = list(range(n + 1))
+    result = []
+    for chain in chains:
+        T = identity
+        for factor in chain:
+            table = tables_by_factor.get(factor)
+            if table is None:
+                table = list(identity)
+                for cycle in factor:
+                    for i in range(len(cycle)):
+                        table[cycle[i-1]] = cycle[i]
+                tables_by_factor[factor] = table
+            # apply T first, then the factor
+            T = list(map(table.__getitem__, T))
+        result.append(array('l', T) if tables else table_to_cycles(T))
+    return result
+
 def cycles_to_table(cycles):
     """Takes a list of cycles and translates it into a permutation table.
     The permutation is assumed to be from 1 to max(max(cycles)). If `(cycles) == 0` (that is, the input represents
@@ -116,30 +242,55 @@ def table_to_cycles(perm_table):
     The permutation is defined by i -> perm_table[i] for i in [1,n] (perm_table[0] is not used).
     :return: The same permutation in cycle form.
     """
-    result = []
-    T = list(perm_table)
-    T[0] = 0
-    n = len(T) - 1
-    while True:
-        # find first untagged element
-        idx = 0
-        while idx <= n and T[idx] <= 0:
-            idx += 1
-        if idx > n:
-            # no more untagged elements, return result
-            return sorted(result)
-        # start new cycle
+    return list(iter_cycles(perm_table))
+
+def iter_cycles(perm_table):
+    """Generate the cycles of a permutation table in normalized form and sorted order.
+
+    The table is scanned once from left to right. Each cycle is started from its first untagged element, which is
+    necessarily its smallest one since all the elements before it have already been tagged: the cycles therefore come
+    out normalized and in increasing order, without any rescan or final sort.
+    Tags are kept in a separate `bytearray` so the input table is left untouched.
+
+    :param perm_table: The permutation in table form (see `table_to_cycles`).
+    :return: A generator yielding the non-singleton cycles as tuples.
+    """
+    n = len(perm_table) - 1
+    tagged = bytearray(n + 1)
+    for start in range(1, n + 1):
+        if tagged[start]:
+            continue
+        # follow the cycle starting at `start`, tagging its elements
         cycle = []
-        while T[idx] > 0:
-            # add current element to cycle
+        idx = start
+        while not tagged[idx]:
             cycle.append(idx)
-            # tag element and go to next one
-            j = T[idx]
-            T[idx] = 0
-            idx = j
-        # end of cycle, add it to result if it is not a singleton
+            tagged[idx] = 1
+            idx = perm_table[idx]
+        # end of cycle, yield it if it is not a singleton
         if len(cycle) > 1:
-            result.append(normalized_tuple(cycle))
+            yield tuple(cycle)
+
+def cycle_decomposition(perm_table):
+    """Compute the cycle structure of a permutation table without building the cycles themselves.
+
+    Each cycle is followed from its smallest element as in `iter_cycles`, and its elements are labelled with that
+    element.
+
+    :param perm_table: The permutation in table form (see `table_to_cycles`).
+    :return: a tuple (labels, lengths, histogram): `labels[i]` is the smallest element of the cycle containing i
+    (`labels[0] = 0`), `lengths` maps each label to the length of its cycle and `histogram` maps each cycle length to
+    the number of cycles of that length. Fixed points count as cycles of length 1.
+    """
+    labels = array('l', bytes(array('l').itemsize * len(perm_table)))
+    for start in range(1, len(perm_table)):
+        idx = start
+        while not labels[idx]:
+            labels[idx] = start
+            idx = perm_table[idx]
+    lengths = Counter(labels[1:])
+    histogram = Counter(lengths.values())
+    return labels, dict(lengths), dict(sorted(histogram.items()))
 
 def normalized_tuple(cycle):
     """Return a normalized version (starting from the smallest element) of the cycle
@@ -166,7 +317,19 @@ def permutation_inverse_I(perm):
     :param perm: The permutation to invert. To be coherent with the other methods, the input should be a list of cycles.
     :return: The inverse of the input, in cycle form.
     """
-    X = cycles_to_table(perm)
+    return table_to_cycles(table_inverse_I(cycles_to_table(perm)))
+
+"""The following functions work directly on permutation tables held in caller-supplied mutable buffers (a list, an
+`array` or a writable `memoryview`). They allocate no new table, so they can be called repeatedly in tight loops.
+As for the other table functions, index 0 is not part of the permutation.
+"""
+
+def table_inverse_I(X):
+    """Invert a permutation table in place (Algorithm I from 1.3.3).
+
+    :param X: The permutation table to invert. It is overwritten with its inverse.
+    :return: `X`
+    """
     #step I1
     m = len(X) - 1
     j = -1
@@ -186,7 +349,136 @@ def permutation_inverse_I(perm):
             #steps I4 and I5
             X[m] = -j
         m -= 1
-    return table_to_cycles(X)
+    return X
+
+def table_product_into(out, S, T):
+    """Store the product ST (S applied first, then T) of two permutation tables in `out`.
+
+    `out` may be `S` itself, but not `T`. All three tables must have the same length.
+
+    :return: `out`
+    """
+    for i in range(1, len(out)):
+        out[i] = T[S[i]]
+    return out
+
+def table_conjugate_into(out, S, T):
+    """Store the conjugate of S by T (that is, the product T^-1 S T) in `out`.
+
+    The conjugate sends T[i] to T[S[i]]: it has the cycles of S, with every element i renamed T[i].
+    `out` must be distinct from both `S` and `T`. All three tables must have the same length.
+
+    :return: `out`
+    """
+    for i in range(1, len(out)):
+        out[T[i]] = T[S[i]]
+    return out
+
+class Permutation(object):
+    """Permutation of {1, ..., n} backed by a contiguous array of machine integers.
+
+    The array holds the table form used by `cycles_to_table` / `table_to_cycles`: `table[i]` is the image of `i` and
+    `table[0] = 0`. Products follow the convention of the rest of the module: `p * q` applies `p` first, then `q`.
+    Permutations on different numbers of points can be mixed; the smaller one is extended with fixed points.
+    """
+    __slots__ = ('table',)
+
+    def __init__(self, table):
+        self.table = array('l', table)
+
+    @classmethod
+    def identity(cls, n):
+        return cls(range(n + 1))
+
+    @classmethod
+    def from_cycles(cls, cycles, n=None):
+        """Build a permutation from a list of cycles, optionally on more points than appear in the cycles."""
+        table = cycles_to_table(cycles)
+        if n is not None and n >= len(table):
+            table.extend(range(len(table), n + 1))
+        return cls(table)
+
+    def to_cycles(self):
+        return table_to_cycles(self.table)
+
+    def __len__(self):
+        return len(self.table) - 1
+
+    def __getitem__(self, i):
+        return self.table[i]
+
+    def __eq__(self, other):
+        if not isinstance(other, Permutation):
+            return NotImplemented
+        n = max(len(self), len(other))
+        return self._padded(n) == other._padded(n)
+
+    def __repr__(self):
+        return 'Permutation(%r)' % self.to_cycles()
+
+    def _padded(self, n):
+        """Return the table extended with fixed points up to `n` (the table itself if it is large enough)."""
+        if len(self.table) > n:
+            return self.table
+        table = array('l', self.table)
+        table.extend(range(len(table), n + 1))
+        return table
+
+    def __mul__(self, other):
+        n = max(len(self), len(other))
+        left = self._padded(n)
+        right = other._padded(n)
+        # (pq)[i] = q[p[i]]: a single gather through `right`
+        return Permutation(map(right.__getitem__, left))
+
+    def inverse(self):
+        table = self.table
+        result = array('l', bytes(table.itemsize * len(table)))
+        for i, j in enumerate(table):
+            result[j] = i
+        return Permutation(result)
+
+    def __pow__(self, k):
+        """Raise the permutation to the (possibly negative) power `k` by repeated squaring."""
+        base = self.inverse() if k < 0 else self
+        k = abs(k)
+        result = Permutation.identity(len(self))
+        while k > 0:
+            if k & 1:
+                result = result * base
+            k >>= 1
+            if k > 0:
+                base = base * base
+        return result
+
+    def cycle_lengths(self):
+        """Return the list of cycle lengths (fixed points included), in order of the cycles' smallest element."""
+        table = self.table
+        tagged = bytearray(len(table))
+        lengths = []
+        for start in range(1, len(table)):
+            if tagged[start]:
+                continue
+            length = 0
+            idx = start
+            while not tagged[idx]:
+                tagged[idx] = 1
+                length += 1
+                idx = table[idx]
+            lengths.append(length)
+        return lengths
+
+    def cycle_type(self):
+        """Return the cycle type as a dict mapping each cycle length (fixed points included) to its multiplicity."""
+        result = {}
+        for length in self.cycle_lengths():
+            result[length] = result.get(length, 0) + 1
+        return dict(sorted(result.items()))
+
+    def order(self):
+        """Return the order of the permutation, i.e. the LCM of its cycle lengths."""
+        return lcm(*self.cycle_type())
+
 
 if __name__ == '__main__':
     perm1 = [(1, 2, 3), (4, 6)]
@@ -0,0 +1,30 @@
+import unittest
+from benchmarks.generators import random_permutation, random_dag, sparse_polynomial, record_layout
+from benchmarks.suite import compare, run, scaling
+from linkedlists import topological_sort, SparsePolynomial
+from multilink import build_data_table
+from permutations import cycles_to_table
+
+
+class BenchmarksTest(unittest.TestCase):
+
+    def test_generators(self):
+        self.assertEqual(sorted(cycles_to_table(random_permutation(50))), list(range(51)))
+        relations = random_dag(30, 100)
+        position = {x: i for (i, x) in enumerate(topological_sort(relations))}
+        self.assertTrue(all(position[j] < position[k] for (j, k) in relations))
+        p = sparse_polynomial(40)
+        self.assertEqual(len(p), 41)
+        self.assertEqual(SparsePolynomial.from_list(p).to_list(), p)
+        sequence = record_layout(200)
+        self.assertEqual(len(sequence), 200)
+        self.assertEqual(len(build_data_table(sequence)[1]), 200)
+
+    def test_run_and_compare(self):
+        results = run(['build_data_table'], sizes=[100, 200], repeat=1)
+        rows = results['cases']['build_data_table']
+        self.assertEqual([row['size'] for row in rows], [100, 200])
+        self.assertEqual(len(scaling(rows)), 2)
+        self.assertEqual(compare(results, results), [])
+        slower = {'cases': {'build_data_table': [dict(rows[0], time=rows[0]['time'] * 2)]}}
+        self.assertEqual([r[:3] for r in compare(results, slower)], [('build_data_table', 100, 'time')])
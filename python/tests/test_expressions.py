@@ -0,0 +1,93 @@
+import math
+import unittest
+from expressions import compile_tree, evaluate, to_source, variables, numpy, _FunctionCache
+from expressions import simplify, size, eliminate_common_subexpressions
+from trees import ArrayTree, BTree, MathError, differentiate
+
+
+class ExpressionsTest(unittest.TestCase):
+    def setUp(self):
+        # (x + 1) * (x - y)
+        l = BTree('OP|+', BTree('VAR|x'), BTree('CONST|1'))
+        r = BTree('OP|-', BTree('VAR|x'), BTree('VAR|y'))
+        self.t = BTree('OP|*', l, r)
+        # ln(x) ^ 2.5
+        self.u = BTree.from_string('(((VAR|x) OP|ln ()) OP|^ (CONST|2.5))')
+
+    def test_variables(self):
+        self.assertEqual(variables(self.t), ['x', 'y'])
+        self.assertEqual(variables(BTree('CONST|1')), [])
+
+    def test_evaluate(self):
+        self.assertEqual(evaluate(self.t, x=2, y=5), -9)
+        self.assertAlmostEqual(evaluate(self.u, x=math.e ** 2), 2 ** 2.5)
+        f = compile_tree(differentiate(self.t, 'x'))
+        self.assertEqual(f(2, 5), 2 * 2 + 1 - 5)
+        self.assertEqual(compile_tree(BTree('CONST|3'))(), 3)
+
+    def test_evaluate_array_tree(self):
+        store = ArrayTree.from_btree(self.t)
+        self.assertEqual(evaluate(store.tree, x=5, y=1), evaluate(self.t, x=5, y=1))
+        self.assertEqual(to_source(store.tree, ['x', 'y']), to_source(self.t, ['x', 'y']))
+        self.assertEqual(size(store.tree, True), size(self.t))
+
+    def test_common_subexpressions(self):
+        # x*y appears twice but is computed once
+        t = BTree.from_string('(((VAR|x) OP|* (VAR|y)) OP|+ ((VAR|x) OP|* (VAR|y)))')
+        self.assertEqual(to_source(t, ['x', 'y']).count('*'), 1)
+        self.assertEqual(evaluate(t, x=3, y=4), 24)
+
+    def test_cache(self):
+        other = BTree.from_string(repr(self.t))
+        self.assertIs(compile_tree(self.t), compile_tree(other))
+        self.assertIs(compile_tree(self.t, ['y', 'x']), compile_tree(other, ('y', 'x')))
+        cache = _FunctionCache(2)
+        trees = [BTree.from_string('((VAR|x) OP|+ (CONST|%d))' % i) for i in range(4)]
+        f = cache.get(trees[0], None)
+        for t in trees[1:]:
+            cache.get(t, None)
+        self.assertEqual(len(cache.functions), 2)
+        self.assertIsNot(cache.get(trees[0], None), f)
+        self.assertEqual(cache.get(trees[3], None)(1), 4)
+        # the nodes of evicted trees are eventually released
+        for i in range(100):
+            cache.get(BTree.from_string('((VAR|x) OP|* (CONST|%d))' % i), None)
+        self.assertLess(len(cache.factory), 20)
+
+    def assertSimplifies(self, s, expected):
+        self.assertEqual(repr(simplify(BTree.from_string(s))), expected)
+
+    def test_simplify(self):
+        self.assertSimplifies('((CONST|2) OP|^ (CONST|3))', '(CONST|8)')
+        self.assertSimplifies('(((VAR|x) OP|ln ()) OP|* ((CONST|2) OP|- (CONST|2)))', '(CONST|0)')
+        self.assertSimplifies('((VAR|x) OP|- (VAR|x))', '(CONST|0)')
+        self.assertSimplifies('((VAR|x) OP|+ (VAR|x))', '((CONST|2) OP|* (VAR|x))')
+        self.assertSimplifies('(((CONST|2) OP|* (VAR|x)) OP|+ ((VAR|x) OP|* (CONST|3)))', '((CONST|5) OP|* (VAR|x))')
+        self.assertSimplifies('(((VAR|x) OP|^ (CONST|2)) OP|* (VAR|x))', '((VAR|x) OP|^ (CONST|3))')
+        self.assertSimplifies('((VAR|y) OP|- ((VAR|x) OP|neg ()))', '((VAR|y) OP|+ (VAR|x))')
+        # not a real number: left as is
+        self.assertSimplifies('((CONST|0) OP|ln ())', '((CONST|0) OP|ln ())')
+        # division by zero is not turned into 1
+        for s in ('((CONST|0) OP|/ (CONST|0))', '(((VAR|x) OP|- (VAR|x)) OP|/ ((VAR|x) OP|- (VAR|x)))',
+                  '((VAR|x) OP|/ (CONST|0))'):
+            self.assertRaises(MathError, simplify, BTree.from_string(s))
+        self.assertSimplifies('(((VAR|x) OP|+ (CONST|1)) OP|/ ((VAR|x) OP|+ (CONST|1)))', '(CONST|1)')
+        # overflowing results are not folded
+        t = BTree.from_string('(((CONST|1e308) OP|* (CONST|10)) OP|/ (VAR|x))')
+        self.assertEqual(repr(simplify(t)), repr(t))
+        self.assertEqual(evaluate(simplify(t), x=2), evaluate(t, x=2))
+
+    def test_simplify_derivatives(self):
+        t = BTree.from_string('(((VAR|x) OP|^ (CONST|3)) OP|/ ((VAR|x) OP|+ (CONST|1)))')
+        d = t
+        for _ in range(3):
+            d = differentiate(d, 'x')
+            s = simplify(d)
+            self.assertLess(size(s), size(d))
+            self.assertAlmostEqual(evaluate(s, x=1.7), evaluate(d, x=1.7))
+        self.assertLess(size(eliminate_common_subexpressions(s), distinct=True), size(s))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_arrays(self):
+        x = numpy.linspace(1, 2, 5)
+        numpy.testing.assert_allclose(compile_tree(self.t)(x, 2 * x), (x + 1) * (x - 2 * x))
@@ -1,5 +1,7 @@
 import unittest
-from linkedlists import topological_sort, polynomial_addition, polynomial_multiplication
+from linkedlists import topological_sort, polynomial_addition, polynomial_multiplication, SparsePolynomial
+from linkedlists import PolynomialPool, pack_abc, unpack_abc, topological_sort_labels
+from linkedlists import IncrementalTopologicalOrder, LoopError, topological_waves, run_topological
 
 
 class LinkedlistsTest(unittest.TestCase):
@@ -25,6 +27,80 @@ class LinkedlistsTest(unittest.TestCase):
     def test_topological_sort_loop(self):
         self.assertRaises(ValueError, topological_sort, self.loop)
 
+    def test_topological_sort_labels(self):
+        order, loop = topological_sort_labels(iter(self.knuth))
+        self.assertIsNone(loop)
+        self.assertEqual(sorted(order), list(range(1, 10)))
+        for (j, k) in self.knuth:
+            self.assertLess(order.index(j), order.index(k))
+        order, loop = topological_sort_labels(('make %s' % j, 'make %s' % k) for (j, k) in self.simple)
+        self.assertEqual(order, ['make 1', 'make 2', 'make 3', 'make 4', 'make 5'])
+        self.assertEqual(topological_sort_labels([]), ([], None))
+
+    def test_topological_sort_labels_loop(self):
+        order, loop = topological_sort_labels(self.loop + [('a', 1), (3, 'b')])
+        self.assertEqual(order, ['a'])
+        self.assertEqual(len(loop), 3)
+        # rotate the loop to start at 1
+        start = loop.index(1)
+        self.assertEqual(loop[start:] + loop[:start], [1, 2, 3])
+
+    def assertOrdered(self, order, relations):
+        for (j, k) in relations:
+            self.assertLess(order.index(j), order.index(k))
+
+    def test_incremental_topological_order(self):
+        ito = IncrementalTopologicalOrder()
+        # insert the relations in an order which forces repairs
+        for (j, k) in reversed(self.knuth):
+            ito.add_relation(j, k)
+            self.assertOrdered(ito.order(), self.knuth[self.knuth.index((j, k)):])
+        self.assertEqual(sorted(ito.order()), list(range(1, 10)))
+        ito.remove_relation(9, 2)
+        ito.add_relation(2, 9)
+        self.assertOrdered(ito.order(), [(2, 9), (9, 5), (2, 8), (1, 3)])
+        ito.remove_object(7)
+        self.assertEqual(len(ito), 8)
+        ito.add_relation(5, 3)
+        self.assertOrdered(ito.order(), [(2, 9), (9, 5), (5, 3), (5, 8), (8, 6)])
+
+    def test_incremental_topological_order_loop(self):
+        ito = IncrementalTopologicalOrder(self.loop[:2] + self.loop[3:])
+        with self.assertRaises(LoopError) as context:
+            ito.add_relation(3, 1)
+        self.assertEqual(context.exception.loop, [3, 1, 2])
+        # the relation was not added
+        self.assertOrdered(ito.order(), [(1, 2), (2, 3), (1, 4)])
+        self.assertRaises(ValueError, ito.add_relation, 4, 4)
+        self.assertRaises(LoopError, ito.add_relation, 5, 5)
+        self.assertNotIn(5, ito)
+
+    def test_incremental_topological_order_compaction(self):
+        ito = IncrementalTopologicalOrder((k, k + 1) for k in range(1, 100))
+        for k in range(1, 101):
+            if k % 4 != 1:
+                ito.remove_object(k)
+        self.assertEqual(ito.order(), list(range(1, 101, 4)))
+        # the holes left by the removed objects are reclaimed
+        self.assertLessEqual(len(ito.objects), 2 * len(ito))
+        ito.add_relation(97, 1)
+        self.assertOrdered(ito.order(), [(97, 1)])
+
+    def test_topological_waves(self):
+        self.assertEqual(topological_waves(self.simple), [[1], [2], [3], [4], [5]])
+        waves = topological_waves(self.knuth)
+        self.assertEqual([sorted(wave) for wave in waves], [[1, 9], [2, 3], [7], [4, 5], [8], [6]])
+        self.assertRaises(ValueError, topological_waves, self.loop)
+
+    def test_run_topological(self):
+        report = run_topological(self.knuth, lambda x: x * x, max_workers=3)
+        self.assertEqual(report.results, {k: k * k for k in range(1, 10)})
+        self.assertOrdered(report.order, self.knuth)
+        self.assertEqual(report.critical_path, 6)
+        self.assertEqual(report.widths, [2, 2, 1, 2, 1, 1])
+        self.assertEqual(run_topological(self.simple, str, processes=True).results[5], '5')
+        self.assertRaises(ValueError, run_topological, self.loop, str)
+
     def test_polynomial_addition_zero(self):
         self.assertEqual(polynomial_addition(self.zero, self.zero), self.zero)
         self.assertEqual(polynomial_addition(self.p, self.zero), self.p)
@@ -53,3 +129,62 @@ class LinkedlistsTest(unittest.TestCase):
         self.assertEqual(polynomial_multiplication(self.p, self.q), self.pq)
         self.assertEqual(polynomial_multiplication(self.q, self.p), self.pq)
         self.assertEqual(polynomial_multiplication(self.p, self.p), self.p2)
+
+    def test_sparse_polynomial_conversion(self):
+        self.assertEqual(SparsePolynomial.from_list(self.zero).to_list(), self.zero)
+        self.assertEqual(SparsePolynomial.from_list(self.pq).to_list(), self.pq)
+        self.assertEqual(len(SparsePolynomial.from_list(self.p)), 3)
+
+    def test_sparse_polynomial_arithmetic(self):
+        p = SparsePolynomial.from_list(self.p)
+        q = SparsePolynomial.from_list(self.q)
+        self.assertEqual((p + q).to_list(), self.p_plus_q)
+        self.assertEqual((p + SparsePolynomial.from_list(self.minus_p)).to_list(), self.zero)
+        self.assertEqual((p * q).to_list(), self.pq)
+        self.assertEqual((q * p).to_list(), self.pq)
+        self.assertEqual((p * SparsePolynomial.from_list(self.one)), p)
+        # in-place accumulation: p^2 - p^2 + p^2
+        acc = p * p
+        acc.add_product(p, SparsePolynomial.from_list(self.minus_p) * SparsePolynomial.from_list(self.one))
+        acc.add_product(p, p)
+        self.assertEqual(acc.to_list(), self.p2)
+
+    def test_polynomial_pool(self):
+        pool = PolynomialPool()
+        P = pool.from_list(self.p)
+        Q = pool.from_list(self.q)
+        self.assertEqual(pool.to_list(pool.add(P, Q)), self.p_plus_q)
+        # p is unchanged, q is updated in place
+        self.assertEqual(pool.to_list(P), self.p)
+        self.assertEqual(pool.to_list(Q), self.p_plus_q)
+        # deleted nodes are recycled: accumulating q + p*(-p) + p*p repeatedly does not grow the pool
+        minus_one = pool.from_list([(-1, (0, 0, 0))] + self.zero)
+        one = pool.from_list(self.one)
+        pool.multiply_add(P, one, Q)
+        pool.multiply_add(P, minus_one, Q)
+        size = len(pool.link)
+        for _ in range(10):
+            pool.multiply_add(P, one, Q)
+            pool.multiply_add(P, minus_one, Q)
+        self.assertEqual(len(pool.link), size)
+        self.assertEqual(pool.to_list(Q), self.p_plus_q)
+        pool.erase(Q)
+        self.assertEqual(pool.to_list(pool.from_list(self.q)), self.q)
+        self.assertEqual(len(pool.link), size)
+
+    def test_pack_abc(self):
+        self.assertEqual(pack_abc((1, 2, 3), 8), (1 << 16) + (2 << 8) + 3)
+        self.assertEqual(pack_abc((0, 0, -1), 8), -1)
+        self.assertEqual(unpack_abc(pack_abc((1, 2, 3), 8), 8), (1, 2, 3))
+        self.assertEqual(unpack_abc(-1, 8), (0, 0, -1))
+        self.assertLess(pack_abc((0, 5, 9), 8), pack_abc((1, 0, 0), 8))
+        self.assertRaises(OverflowError, pack_abc, (128, 0, 0), 8)
+
+    def test_polynomial_packed(self):
+        self.assertEqual(polynomial_addition(self.p, self.q, bits=8), self.p_plus_q)
+        self.assertEqual(polynomial_addition(self.p, self.minus_p, bits=8), self.zero)
+        self.assertEqual(polynomial_multiplication(self.p, self.q, bits=8), self.pq)
+        self.assertEqual(polynomial_multiplication(self.zero, self.p, bits=8), self.zero)
+        self.assertEqual(polynomial_multiplication(self.p, self.p, bits=3), self.p2)
+        # (x^2)^2 needs exponent 4, which does not fit in 2 bits plus the guard bit
+        self.assertRaises(OverflowError, polynomial_multiplication, self.q, self.q, 3)
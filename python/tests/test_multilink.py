@@ -1,13 +1,16 @@
 import unittest
-from multilink import build_data_table
+from multilink import build_data_table, build_data_arrays, DataTableBuilder
+from multilink import qualified_reference, ReferenceIndex, move_corresponding
 
 
 class MultilinkTest(unittest.TestCase):
 
+    def setUp(self):
+        self.sequence = ((1, 'A'), (3, 'B'), (7, 'C'), (7, 'D'), (3,'E'), (3, 'F'), (4, 'G'), (1, 'H'),
+                         (5, 'F'), (8, 'G'), (5, 'B'), (5, 'C'), (9, 'E'), (9, 'D'), (9, 'G'))
+
     def test_algo_A(self):
-        sequence = ((1, 'A'), (3, 'B'), (7, 'C'), (7, 'D'), (3,'E'), (3, 'F'), (4, 'G'), (1, 'H'),
-                    (5, 'F'), (8, 'G'), (5, 'B'), (5, 'C'), (9, 'E'), (9, 'D'), (9, 'G'))
-        symbols, data = build_data_table(sequence)
+        symbols, data = build_data_table(self.sequence)
         expected_symbols = ['A1', 'B5', 'C5', 'D9', 'E9', 'F5', 'G9', 'H1']
         for symbol in expected_symbols:
             self.assertTrue(symbol in symbols.values())
@@ -21,4 +24,96 @@ class MultilinkTest(unittest.TestCase):
         }
         for (k, v) in expected_data.items():
             for (name, value) in zip(names, v):
-                self.assertEqual(getattr(data[k], name), value)
\ No newline at end of file
+                self.assertEqual(getattr(data[k], name), value)
+
+    def test_builder(self):
+        symbols, data = build_data_table(self.sequence)
+        builder = DataTableBuilder()
+        # the A group is complete once H is read; the H group only at the end
+        builder.feed(self.sequence[:7])
+        self.assertEqual(builder.pop_groups(), [])
+        builder.feed(self.sequence[7:9])
+        groups = builder.pop_groups()
+        self.assertEqual([sorted(g) for g in groups], [['A1', 'B3', 'C7', 'D7', 'E3', 'F3', 'G4']])
+        self.assertEqual(groups[0]['A1'].sib, 'H1')
+        self.assertEqual(sorted(builder.data_table), ['F5', 'H1'])
+        builder.feed(self.sequence[9:]).finish()
+        groups += builder.pop_groups()
+        self.assertEqual(builder.data_table, {})
+        self.assertEqual(builder.symbol_table, symbols)
+        exported = {}
+        for group in groups:
+            exported.update(group)
+        self.assertEqual(sorted(exported), sorted(data))
+        for (key, element) in data.items():
+            for name in ('prev', 'parent', 'name', 'child', 'sib'):
+                self.assertEqual(getattr(exported[key], name), getattr(element, name))
+
+    def test_builder_lines(self):
+        lines = ['      * customer file', '01 CUSTOMER.', '   05 NAME PIC X(20).', '', '   05 ADDRESS.',
+                 '      10 CITY PIC X(10).', '01 ORDER.', '   05 NAME PIC X(20).']
+        builder = DataTableBuilder().feed_lines(iter(lines))
+        self.assertEqual(sorted(builder.data_table),
+                         ['ADDRESS5', 'CITY10', 'CUSTOMER1', 'NAME5', 'NAME5#2', 'ORDER1'])
+        # both NAME fields are kept, linked through PREV
+        self.assertEqual(builder.symbol_table['NAME'], 'NAME5#2')
+        self.assertEqual(builder.data_table['NAME5#2'].prev, 'NAME5')
+        self.assertEqual(builder.data_table['NAME5#2'].parent, 'ORDER1')
+        self.assertEqual(builder.data_table['NAME5'].parent, 'CUSTOMER1')
+        self.assertEqual(builder.data_table['CITY10'].parent, 'ADDRESS5')
+        self.assertEqual([sorted(g) for g in builder.pop_groups()], [['ADDRESS5', 'CITY10', 'CUSTOMER1', 'NAME5']])
+        with self.assertRaises(ValueError):
+            builder.feed_lines(['   03 BAD.'])
+
+    def test_algo_A_arrays(self):
+        table = build_data_arrays(self.sequence)
+        symbols, data = build_data_table(self.sequence)
+        self.assertEqual(len(table), 15)
+        # entry numbers follow the input order: compare each entry with the matching key of the dict table
+        keys = [None] + ['%s%d' % (P, L) for (L, P) in self.sequence]
+        for i in range(1, 16):
+            element = table.element(i)
+            for name in ('prev', 'parent', 'child', 'sib'):
+                self.assertEqual(keys[getattr(element, name) or 0], getattr(data[keys[i]], name))
+            self.assertEqual(element.name, data[keys[i]].name)
+        self.assertEqual(keys[table.lookup('G')], symbols['G'])
+        self.assertEqual(table.lookup('Z'), 0)
+
+    def test_algo_A_arrays_duplicates(self):
+        # two entries named B at level 2 (keys B2 and B2#2 in build_data_table), told apart by their entry numbers
+        table = build_data_arrays(((1, 'A'), (2, 'B'), (2, 'B')))
+        self.assertEqual(list(table.sib), [0, 0, 3, 0])
+        self.assertEqual(table.prev[3], 2)
+        self.assertRaises(ValueError, build_data_arrays, ((1, 'A'), (3, 'B'), (2, 'C')))
+
+    def test_algo_B(self):
+        symbols, data = build_data_table(self.sequence)
+        index = ReferenceIndex(symbols, data)
+        cases = [('G OF F OF A', 'G4'), ('E OF C', 'E9'), ('C OF B', 'C7'), ('D OF H', 'D9'), ('B IN H', 'B5'),
+                 ('Z OF A', None), ('A OF H', None), (['F', 'H'], 'F5')]
+        for (reference, expected) in cases:
+            self.assertEqual(qualified_reference(symbols, data, reference), expected)
+            self.assertEqual(index.resolve(reference), expected)
+        for reference in ('G', 'G OF F', 'G OF H', 'D'):
+            self.assertRaises(ValueError, qualified_reference, symbols, data, reference)
+            self.assertRaises(ValueError, index.resolve, reference)
+        self.assertEqual(index.resolve_all(['A', 'C OF B OF A', 'G OF F OF H']), ['A1', 'C7', 'G8'])
+
+    def test_algo_B_repeated_keys(self):
+        # NAME is used at the same level in both records
+        symbols, data = build_data_table(((1, 'CUSTOMER'), (5, 'NAME'), (1, 'ORDER'), (5, 'NAME')))
+        self.assertEqual(qualified_reference(symbols, data, 'NAME OF CUSTOMER'), 'NAME5')
+        self.assertEqual(qualified_reference(symbols, data, 'NAME OF ORDER'), 'NAME5#2')
+        self.assertRaises(ValueError, qualified_reference, symbols, data, 'NAME')
+        # a table whose PREV links loop is rejected rather than searched forever
+        data['NAME5#2'].prev = 'NAME5#2'
+        self.assertRaises(ValueError, qualified_reference, symbols, data, 'NAME OF CUSTOMER')
+
+    def test_algo_C(self):
+        sequence = ((1, 'A'), (3, 'B'), (5, 'C'), (5, 'D'), (3, 'E'), (3, 'G'),
+                    (1, 'H'), (2, 'G'), (2, 'B'), (4, 'D'), (4, 'X'), (2, 'E'), (6, 'F'))
+        symbols, data = build_data_table(sequence)
+        self.assertEqual(move_corresponding(data, 'A1', 'H1'), [('D5', 'D4'), ('E3', 'E2'), ('G3', 'G2')])
+        self.assertEqual(move_corresponding(data, 'E3', 'E2'), [('E3', 'E2')])
+        # no names in common between the children of both groups
+        self.assertEqual(move_corresponding(data, 'B3', 'E2'), [])
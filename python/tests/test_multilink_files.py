@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from multilink import build_data_table, qualified_reference
+from multilink_files import write_data_table, load_data_table
+
+
+class MultilinkFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'table')
+        self.sequence = ((1, 'A'), (3, 'B'), (7, 'C'), (7, 'D'), (3,'E'), (3, 'F'), (4, 'G'), (1, 'H'),
+                         (5, 'F'), (8, 'G'), (5, 'B'), (5, 'C'), (9, 'E'), (9, 'D'), (9, 'G'))
+        self.symbols, self.data = build_data_table(self.sequence)
+        write_data_table(self.path, self.symbols, self.data)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        with load_data_table(self.path) as table:
+            self.assertEqual(len(table), 15)
+            self.assertEqual(list(table), list(self.data))
+            for (key, element) in self.data.items():
+                view = table[key]
+                for name in ('prev', 'parent', 'name', 'child', 'sib', 'key'):
+                    self.assertEqual(getattr(view, name), getattr(element, name))
+                self.assertEqual(repr(view.to_element()), repr(element))
+            self.assertNotIn('Z1', table)
+            self.assertRaises(KeyError, table.__getitem__, 'A2')
+            self.assertEqual(dict(table.symbol_table), self.symbols)
+            self.assertIsNone(table.lookup('Z'))
+
+    def test_qualified_reference(self):
+        with load_data_table(self.path) as table:
+            for reference in ('G OF F', 'E OF A', 'C OF H', 'D'):
+                try:
+                    expected = qualified_reference(self.symbols, self.data, reference)
+                except ValueError:
+                    self.assertRaises(ValueError, qualified_reference, table.symbol_table, table, reference)
+                else:
+                    self.assertEqual(qualified_reference(table.symbol_table, table, reference), expected)
+
+    def test_bad_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 32)
+        self.assertRaises(ValueError, load_data_table, self.path)
+        write_data_table(self.path, self.symbols, self.data)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for size in (8, len(data) - 1):
+            with open(self.path, 'wb') as f:
+                f.write(data[:size])
+            self.assertRaises(ValueError, load_data_table, self.path)
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from permutation_files import load_table, write_table, create_table, inverse_file, product_files
+from permutations import cycles_to_table, table_to_cycles
+
+
+class PermutationFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.perm1_table = [0, 2, 3, 1, 6, 5, 4]
+        self.inv_perm1 = [(1, 3, 2), (4, 6)]
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def test_round_trip(self):
+        for itemsize in (4, 8):
+            write_table(self.path('p'), self.perm1_table, itemsize)
+            with load_table(self.path('p')) as T:
+                self.assertEqual(T.n, 6)
+                self.assertEqual(T.table.tolist(), self.perm1_table)
+        with create_table(self.path('id'), 3) as T:
+            self.assertEqual(T.table.tolist(), [0, 1, 2, 3])
+            T.table[1], T.table[2] = 2, 1
+        with load_table(self.path('id')) as T:
+            self.assertEqual(table_to_cycles(T.table), [(1, 2)])
+
+    def test_bad_file(self):
+        with open(self.path('bad'), 'wb') as f:
+            f.write(b'\0' * 32)
+        self.assertRaises(ValueError, load_table, self.path('bad'))
+        # shorter than the header, and truncated tables
+        write_table(self.path('p'), self.perm1_table)
+        with open(self.path('p'), 'rb') as f:
+            data = f.read()
+        for size in (0, 8, len(data) - 8, len(data) - 1):
+            with open(self.path('short'), 'wb') as f:
+                f.write(data[:size])
+            self.assertRaises(ValueError, load_table, self.path('short'))
+
+    def test_inverse_file(self):
+        write_table(self.path('p'), self.perm1_table)
+        inverse_file(self.path('p'), self.path('inv'), chunk_size=4)
+        with load_table(self.path('inv')) as T:
+            self.assertEqual(table_to_cycles(T.table), self.inv_perm1)
+
+    def test_product_files(self):
+        write_table(self.path('s'), cycles_to_table([(1, 2), (4,)]))
+        write_table(self.path('t'), cycles_to_table([(2, 3), (4,)]))
+        product_files(self.path('s'), self.path('t'), self.path('st'), chunk_size=3)
+        with load_table(self.path('st')) as T:
+            self.assertEqual(table_to_cycles(T.table), [(1, 3, 2)])
+        write_table(self.path('u'), [0, 1])
+        self.assertRaises(ValueError, product_files, self.path('s'), self.path('u'), self.path('su'))
@@ -1,6 +1,10 @@
+import random
 import unittest
-from permutations import table_to_cycles, cycles_to_table
+from array import array
+from permutations import table_to_cycles, cycles_to_table, iter_cycles
 from permutations import permutation_product_A, permutation_product_B, permutation_inverse_I
+from permutations import Permutation, permutation_product_batch
+from permutations import table_inverse_I, table_product_into, table_conjugate_into, cycle_decomposition
 
 
 class PermutationTest(unittest.TestCase):
@@ -18,6 +22,25 @@ class PermutationTest(unittest.TestCase):
     def test_table_to_cycles(self):
         self.assertEqual(table_to_cycles(list(range(6))), [])
         self.assertEqual(table_to_cycles(self.perm1_table), self.perm1)
+        # cycles come out normalized and sorted even when the table is not in that order
+        self.assertEqual(table_to_cycles([0, 5, 1, 6, 3, 2, 4]), [(1, 5, 2), (3, 6, 4)])
+
+    def test_iter_cycles(self):
+        self.assertEqual(list(iter_cycles([0])), [])
+        cycles = iter_cycles(self.perm1_table)
+        self.assertEqual(next(cycles), (1, 2, 3))
+        self.assertEqual(list(cycles), [(4, 6)])
+        # the input table is not modified
+        self.assertEqual(self.perm1_table, [0, 2, 3, 1, 6, 5, 4])
+
+    def test_cycle_decomposition(self):
+        labels, lengths, histogram = cycle_decomposition([0, 5, 1, 6, 3, 2, 4, 7])
+        self.assertEqual(list(labels), [0, 1, 1, 3, 3, 1, 3, 7])
+        self.assertEqual(lengths, {1: 3, 3: 3, 7: 1})
+        self.assertEqual(histogram, {1: 1, 3: 2})
+        table = cycles_to_table([tuple(range(1, 40)), (40, 41)])
+        self.assertEqual(cycle_decomposition(table)[2], {2: 1, 39: 1})
+        self.assertEqual(cycle_decomposition([0]), (array('l', [0]), {}, {}))
 
     def test_cycles_to_table(self):
         self.assertEqual(cycles_to_table([]), [0,1])
@@ -36,6 +59,14 @@ class PermutationTest(unittest.TestCase):
         self.assertEqual(permutation_product_A([self.perm1, self.inv_perm1]), [])
         self.assertEqual(permutation_product_A(self.perm3 + self.perm3), [])
 
+    def test_permutation_product_A_indexed(self):
+        self.assertEqual(permutation_product_A([], indexed=True), [])
+        self.assertEqual(permutation_product_A([(1,)], indexed=True), [])
+        self.assertEqual(permutation_product_A(self.knuth, indexed=True), self.knuth_res)
+        self.assertEqual(permutation_product_A([self.perm1, self.inv_perm1], indexed=True), [])
+        for perms in (self.perm1 + self.perm2, self.perm2 + self.perm3 + self.perm1, self.knuth + self.perm3):
+            self.assertEqual(permutation_product_A(perms, indexed=True), permutation_product_A(perms))
+
     def test_permutation_product_B(self):
         #identity -> nothing happens
         self.assertEqual(permutation_product_B([]), [])
@@ -47,7 +78,87 @@ class PermutationTest(unittest.TestCase):
         self.assertEqual(permutation_product_B([self.perm1, self.inv_perm1]), [])
         self.assertEqual(permutation_product_B(self.perm3 + self.perm3), [])
 
+    def test_permutation_product_batch(self):
+        chains = [self.knuth, [self.perm1, self.inv_perm1], [], self.perm2 + self.perm3]
+        expected = [permutation_product_B(chain) for chain in chains]
+        self.assertEqual(permutation_product_batch(chains), expected)
+        self.assertEqual(permutation_product_batch(chains, processes=2), expected)
+        tables = permutation_product_batch(chains, n=8, tables=True)
+        self.assertEqual([table_to_cycles(t) for t in tables], expected)
+        self.assertEqual(len(tables[2]), 9)
+
+    def test_permutation_product_batch_many_cycles(self):
+        # factors made of many disjoint transpositions, given as permutations and as a flat list of cycles
+        rng = random.Random(1)
+        perms = []
+        for _ in range(3):
+            points = rng.sample(range(1, 201), 200)
+            perms.append([(points[i], points[i + 1]) for i in range(0, 200, 2)])
+        expected = permutation_product_B(perms)
+        self.assertEqual(permutation_product_batch([perms, [c for p in perms for c in p]]), [expected, expected])
+
     def test_permutation_inverse_I(self):
         self.assertEqual(permutation_inverse_I([]),[])
         self.assertEqual(permutation_inverse_I(self.perm1), self.inv_perm1)
         self.assertEqual(permutation_inverse_I(self.perm3), self.perm3)
+
+    def test_table_inverse_I(self):
+        X = list(self.perm1_table)
+        self.assertIs(table_inverse_I(X), X)
+        self.assertEqual(table_to_cycles(X), self.inv_perm1)
+        buffer = array('l', self.perm1_table)
+        table_inverse_I(memoryview(buffer))
+        self.assertEqual(table_to_cycles(buffer), self.inv_perm1)
+
+    def test_table_product_into(self):
+        S = cycles_to_table([(1, 2)] + [(6,)])
+        T = cycles_to_table([(2, 3)] + [(6,)])
+        out = [0] * len(S)
+        self.assertEqual(table_to_cycles(table_product_into(out, S, T)), [(1, 3, 2)])
+        # in place on S
+        table_product_into(S, S, T)
+        self.assertEqual(S, out)
+        inverse = table_inverse_I(list(self.perm1_table))
+        self.assertEqual(table_to_cycles(table_product_into(inverse, inverse, self.perm1_table)), [])
+
+    def test_table_conjugate_into(self):
+        S = cycles_to_table(self.perm1)
+        T = cycles_to_table([(1, 4), (2, 6, 5)])
+        out = [0] * len(S)
+        table_conjugate_into(out, S, T)
+        self.assertEqual(table_to_cycles(out), [(1, 5), (3, 4, 6)])
+        self.assertEqual(table_to_cycles(out), permutation_product_B([(1, 4), (2, 5, 6)] + self.perm1 + [(1, 4), (2, 6, 5)]))
+
+
+class PermutationClassTest(unittest.TestCase):
+
+    def setUp(self):
+        self.knuth = [(1, 3, 6, 7), (2, 3, 4), (1, 5, 4), (6, 1, 4, 5), (2, 7, 6, 1, 5)]
+        self.perm1 = Permutation.from_cycles([(1, 2, 3), (4, 6)])
+
+    def test_conversions(self):
+        self.assertEqual(self.perm1.to_cycles(), [(1, 2, 3), (4, 6)])
+        self.assertEqual(list(self.perm1.table), [0, 2, 3, 1, 6, 5, 4])
+        self.assertEqual(len(Permutation.from_cycles([(1, 2)], n=5)), 5)
+        self.assertEqual(Permutation.from_cycles([]).to_cycles(), [])
+
+    def test_product(self):
+        product = Permutation.identity(1)
+        for cycle in self.knuth:
+            product = product * Permutation.from_cycles([cycle])
+        self.assertEqual(product.to_cycles(), permutation_product_B(self.knuth))
+        self.assertEqual(Permutation.from_cycles([(1, 2)]) * Permutation.from_cycles([(2, 3)]),
+                         Permutation.from_cycles([(1, 3, 2)]))
+
+    def test_inverse_and_power(self):
+        self.assertEqual(self.perm1.inverse().to_cycles(), [(1, 3, 2), (4, 6)])
+        self.assertEqual(self.perm1 * self.perm1.inverse(), Permutation.identity(6))
+        self.assertEqual(self.perm1 ** 0, Permutation.identity(1))
+        self.assertEqual(self.perm1 ** 2, self.perm1 * self.perm1)
+        self.assertEqual(self.perm1 ** 7, self.perm1)
+        self.assertEqual(self.perm1 ** -1, self.perm1.inverse())
+
+    def test_order_and_cycle_type(self):
+        self.assertEqual(self.perm1.cycle_type(), {1: 1, 2: 1, 3: 1})
+        self.assertEqual(self.perm1.order(), 6)
+        self.assertEqual(Permutation.identity(4).order(), 1)
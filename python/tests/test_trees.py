@@ -1,5 +1,7 @@
+import io
 import unittest
-from trees import BTree, in_order
+from trees import BTree, ArrayTree, NodeFactory, ParseError, in_order, differentiate
+from trees import iter_in_order, iter_pre_order, iter_post_order, iter_level_order, ThreadedTree
 
 
 class TreesTest(unittest.TestCase):
@@ -13,3 +15,152 @@ class TreesTest(unittest.TestCase):
         self.assertEqual(in_order(None), [])
         self.assertEqual(in_order(BTree("A", BTree("B"), BTree("C"))), ["B", "A", "C"])
         self.assertEqual(in_order(self.tree), ['D', 'B', 'A', 'E', 'G', 'C', 'H', 'F', 'J'])
+
+    def test_traversals(self):
+        self.assertEqual(list(iter_in_order(self.tree)), in_order(self.tree))
+        self.assertEqual(list(iter_pre_order(self.tree)), ['A', 'B', 'D', 'C', 'E', 'G', 'F', 'H', 'J'])
+        self.assertEqual(list(iter_post_order(self.tree)), ['D', 'B', 'G', 'E', 'H', 'J', 'F', 'C', 'A'])
+        self.assertEqual(list(iter_level_order(self.tree)), ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'J'])
+        for traversal in (iter_in_order, iter_pre_order, iter_post_order, iter_level_order):
+            self.assertEqual(list(traversal(None)), [])
+        # generators can be stopped early
+        self.assertEqual(next(iter_post_order(self.tree)), 'D')
+
+    def test_threaded_tree(self):
+        threaded = ThreadedTree(self.tree)
+        self.assertEqual(len(threaded), 9)
+        self.assertEqual(list(threaded), in_order(self.tree))
+        # walk backwards from the last node
+        p = threaded.predecessor(0)
+        values = []
+        while p != 0:
+            values.append(threaded.info[p])
+            p = threaded.predecessor(p)
+        self.assertEqual(values, in_order(self.tree)[::-1])
+        self.assertEqual(list(ThreadedTree(None)), [])
+
+    def test_traversals_shared(self):
+        # hash-consed DAG: both operands of x*x are the same node
+        factory = NodeFactory()
+        x = factory('VAR|x')
+        square = factory('OP|*', x, x)
+        self.assertEqual(list(iter_post_order(square)), ['VAR|x', 'VAR|x', 'OP|*'])
+        self.assertEqual(list(ThreadedTree(square)), ['VAR|x', 'OP|*', 'VAR|x'])
+        # views of an ArrayTree are new objects on each access
+        store = ArrayTree.from_btree(self.tree)
+        for traversal in (iter_in_order, iter_pre_order, iter_post_order, iter_level_order):
+            self.assertEqual(list(traversal(store.tree)), list(traversal(self.tree)))
+        threaded = ThreadedTree(store.tree)
+        self.assertEqual(list(threaded), in_order(self.tree))
+        self.assertEqual(threaded.predecessor(0), len(threaded))
+
+    def test_from_string(self):
+        self.assertEqual(repr(BTree.from_string(repr(self.tree))), repr(self.tree))
+        self.assertIsNone(BTree.from_string('()'))
+        self.assertEqual(BTree.from_string('((x) OP|^ (2))').value, 'OP|^')
+        # deep trees do not hit the recursion limit
+        depth = 5000
+        t = BTree.from_string('((x) OP|+ ' * depth + '(x)' + ')' * depth)
+        for _ in range(depth):
+            t = t.right
+        self.assertTrue(t.is_leaf)
+
+    def test_from_string_whitespace(self):
+        # whitespace is removed everywhere, including inside values
+        for (s, expected) in (('(A B)', '(AB)'), ('( A )', '(A)'), ('(( x ) O P ( y ))', '((x) OP (y))'),
+                              (' ((x)+(y)) ', '((x) + (y))'), ('(() A ( B ))', '(() A (B))')):
+            self.assertEqual(repr(BTree.from_string(s)), expected)
+        self.assertEqual(BTree.from_string('(( x ) O P ( y ))').value, 'OP')
+        for s in ('((x) (y) (z))', '(A (x) B)', '((x) A)', '(x))', '(((x) A (y))'):
+            self.assertRaises(ParseError, BTree.from_string, s)
+
+    def test_from_string_errors(self):
+        with self.assertRaisesRegex(ParseError, 'position 5'):
+            BTree.from_string('((A) (C))')
+        with self.assertRaisesRegex(ParseError, 'position 0 is not closed'):
+            BTree.from_string('(((A) B (C))')
+        self.assertRaises(ParseError, BTree.from_string, '(A) (B)')
+        self.assertRaises(ParseError, BTree.from_string, '')
+
+    def test_from_file(self):
+        s = repr(self.tree)
+        for chunk_size in (1, 2, 7, 100):
+            self.assertEqual(repr(BTree.from_file(io.StringIO(s), chunk_size)), s)
+            self.assertEqual(repr(BTree.from_file(io.BytesIO(s.encode()), chunk_size)), s)
+
+    def test_array_tree(self):
+        store = ArrayTree.from_btree(self.tree)
+        self.assertEqual(len(store), 9)
+        self.assertEqual(repr(store.tree), repr(self.tree))
+        self.assertEqual(in_order(store.tree), in_order(self.tree))
+        # copy from the views of another ArrayTree
+        t = BTree.from_string('(((VAR|x) OP|+ (VAR|y)) OP|* ((VAR|z) OP|- (VAR|w)))')
+        copy = ArrayTree.from_btree(ArrayTree.from_btree(t).tree)
+        self.assertEqual(len(copy), 7)
+        self.assertEqual(repr(copy.tree), repr(t))
+        self.assertEqual(repr(ArrayTree.from_btree(store.tree).to_btree()), repr(self.tree))
+        self.assertEqual(repr(store.to_btree()), repr(self.tree))
+        self.assertEqual(store.tree.left, store.tree.left)
+        self.assertIsNone(store.tree.left.right)
+
+    def test_array_tree_sharing(self):
+        x = BTree('VAR|x')
+        square = BTree('OP|*', x, x)
+        t = BTree('OP|+', square, square)
+        store = ArrayTree.from_btree(t)
+        # x, x*x and the sum; labels are interned
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.labels, ['VAR|x', 'OP|*', 'OP|+'])
+        self.assertEqual(repr(differentiate(store.tree, 'x')), repr(differentiate(t, 'x')))
+        # interning views of an ArrayTree
+        t = BTree.from_string('(((VAR|x) OP|+ (VAR|y)) OP|* ((VAR|x) OP|- (CONST|3)))')
+        store = ArrayTree.from_btree(t)
+        self.assertEqual(repr(NodeFactory().intern(store.tree)), repr(t))
+        expected = repr(differentiate(t, 'x', NodeFactory()))
+        self.assertNotEqual(expected, '(CONST|0)')
+        self.assertEqual(repr(differentiate(store.tree, 'x', NodeFactory())), expected)
+
+    def test_differentiate_division(self):
+        t = BTree.from_string('((VAR|x) OP|/ (CONST|2))')
+        self.assertEqual(repr(differentiate(t, 'x')), '((CONST|1) OP|/ (CONST|2))')
+
+    def test_node_factory(self):
+        factory = NodeFactory()
+        x = factory('VAR|x')
+        self.assertIs(factory('OP|*', x, factory('VAR|x')), factory('OP|*', x, x))
+        t = BTree.from_string('(((VAR|x) OP|* (VAR|y)) OP|+ ((VAR|x) OP|* (VAR|y)))')
+        shared = factory.intern(t)
+        self.assertIs(shared.left, shared.right)
+        self.assertIs(factory.intern(shared), shared)
+        self.assertEqual(len(factory), 5)
+
+    def test_differentiate_memoized(self):
+        # x^8 as a product of 8 factors
+        t = BTree('VAR|x')
+        for _ in range(7):
+            t = BTree('OP|*', t, BTree('VAR|x'))
+        factory = NodeFactory()
+        first = differentiate(t, 'x', factory)
+        self.assertEqual(repr(first), repr(differentiate(t, 'x')))
+        self.assertIs(differentiate(t, 'x', factory), first)
+        second = differentiate(first, 'x', factory)
+        self.assertEqual(repr(second), repr(differentiate(differentiate(t, 'x'), 'x')))
+        # the shared representation of the second derivative stays small
+        self.assertLess(len(factory), 100)
+
+    def test_differentiate_deep(self):
+        depth = 5000
+        t = BTree.from_string('((VAR|x) OP|+ ' * depth + '(VAR|x)' + ')' * depth)
+        d = differentiate(t, 'x')
+        for _ in range(depth):
+            self.assertEqual(d.left.value, 'CONST|1')
+            d = d.right
+        self.assertEqual(d.value, 'CONST|1')
+
+    def test_differentiate_shared(self):
+        # (s + x) * s with s = x * y shared between both operands
+        s = BTree('OP|*', BTree('VAR|x'), BTree('VAR|y'))
+        t = BTree('OP|*', BTree('OP|+', s, BTree('VAR|x')), s)
+        expected = '(((((VAR|x) OP|* (VAR|y)) OP|+ (VAR|x)) OP|* (VAR|y)) OP|+ (((VAR|y) OP|+ (CONST|1)) OP|* ' \
+                   '((VAR|x) OP|* (VAR|y))))'
+        self.assertEqual(repr(differentiate(t, 'x')), expected)
@@ -2,7 +2,12 @@
 
 """
 
+import codecs
+import collections
+import itertools
+import operator
 import re
+from array import array
 
 
 class ParseError(Exception):
@@ -11,21 +16,12 @@ class ParseError(Exception):
 class MathError(Exception):
     pass
 
-class BTree(object):
-    """Simple binary tree class.
-
-    Some shortcomings:
-    * No check that children are actually binary tree.
-    * Needs a formal definition and management of empty trees.
-    * Parsing from string has not been tested robustly.
-    * Clunky `rec_repr` function.
+class TreeNode(object):
+    """Common interface of binary tree nodes: a `value` and two children `left` and `right` (None if empty).
 
-    Do not use in real life!"""
-
-    def __init__(self, value, left=None, right=None):
-        self.value = value
-        self.left = left
-        self.right = right
+    The traversal and differentiation functions below only rely on this interface, so they work on both `BTree`
+    and `ArrayTree` nodes."""
+    __slots__ = ()
 
     def __repr__(self):
         return self.rec_repr()
@@ -60,56 +56,273 @@ class BTree(object):
     def is_leaf(self):
         return self.left is None and self.right is None
 
+class BTree(TreeNode):
+    """Simple binary tree class.
+
+    Some shortcomings:
+    * No check that children are actually binary tree.
+    * Needs a formal definition and management of empty trees.
+    * Parsing from string has not been tested robustly.
+    * Clunky `rec_repr` function.
+
+    Do not use in real life!"""
+
+    def __init__(self, value, left=None, right=None):
+        self.value = value
+        self.left = left
+        self.right = right
+
     """The following methods parse a string into a BTree.
     The grammar is the following:
     ROOT := ( INNER
     INNER := ) | VALUE ) | ROOT VALUE ROOT )
-    VALUE := [^(^)]+ (any string of characters that aren't a parenthesis) 
-
-    Heavily influenced by these posts:
-    * https://stackoverflow.com/questions/19749883/how-to-parse-parenthetical-trees-in-python
-    * http://blog.erezsh.com/how-to-write-a-calculator-in-70-python-lines-by-writing-a-recursive-descent-parser/
+    VALUE := [^()]+ (any string of characters that aren't a parenthesis; whitespace is ignored)
+
+    Rather than using recursive descent, the parser keeps an explicit stack of the subtrees that are still open, so
+    that the depth of the tree is not limited by the recursion limit. The input is read in a single pass, from a
+    string or in chunks from a file.
+    Since whitespace is ignored, it is removed before the tokens are split, and the cases `)` and `VALUE )` of INNER
+    are read together with their left paren as a single leaf token `(VALUE)` (or `()`): what remains is
+    ROOT := LEAF | ( ROOT VALUE ROOT ), and a single state tells which token may come next.
     """
-    @staticmethod
-    def tokenize(s):
-        """split the input string in suitable tokens."""
-        regex = "[^\(^\)]+|\(|\)"
-        tokens = re.findall(regex, s.replace(' ', ''))
-        return iter(tokens)
+    # states of the parser: a subtree is expected as the left child, the right child or the whole tree, then the
+    # value of an open subtree, its right paren, or nothing at all
+    _LEFT, _RIGHT, _ROOT, _VALUE, _CLOSE, _DONE = range(6)
+    # state once the subtree expected in states _LEFT, _RIGHT and _ROOT is complete
+    _NEXT = (_VALUE, _CLOSE, _DONE)
+    _token_regex = re.compile(r'\([^()]*\)|\(|\)|[^()]+')
 
     @classmethod
-    def parse_root(cls, tokens):
-        cur = next(tokens)
-        if cur != '(':
-            raise ParseError('Expected left paren, got %s instead' % cur)
-        return cls.parse_inner(tokens)
+    def tokenize(cls, chunks):
+        """Split the input in tokens.
+
+        The input is cut after the last right paren of each chunk, and the rest is carried over to the next chunk, so
+        that tokens are never cut in two.
+
+        :param chunks: an iterable of strings, which are concatenated to form the input
+        :return: a generator of (tokens, text, offset) triples, where text is a piece of the input starting at position
+        offset, and tokens the list of its tokens once whitespace is removed
+        """
+        offset = 0
+        pending = ''
+        for chunk in chunks:
+            text = pending + chunk
+            end = text.rfind(')') + 1
+            pending = text[end:]
+            if end > 0:
+                yield cls._token_regex.findall(''.join(text[:end].split())), text[:end], offset
+                offset += end
+        tokens = cls._token_regex.findall(''.join(pending.split()))
+        if tokens:
+            yield tokens, pending, offset
+
+    @staticmethod
+    def _position(tokens, index, text, offset):
+        """Return the position in the input of tokens[index], for a (tokens, text, offset) triple of `tokenize`."""
+        # number of characters of the text before the token, once whitespace is removed
+        rest = sum(map(len, tokens[:index]))
+        for (i, c) in enumerate(text):
+            if not c.isspace():
+                if rest == 0:
+                    return offset + i
+                rest -= 1
 
     @classmethod
-    def parse_inner(cls, tokens):
-        cur = next(tokens)
-        if cur == ')':
-            # case 1: )
-            return None
-        elif cur != '(':
-            # case 2: VALUE )
-            result = cls(cur)
+    def _error(cls, state, token, pos):
+        if state <= cls._ROOT:
+            expected = 'left paren'
+        elif state == cls._VALUE:
+            expected = 'value'
+        elif state == cls._CLOSE:
+            expected = 'right paren'
         else:
-            # case 3: ROOT VALUE ROOT )
-            left = cls.parse_inner(tokens)
-            value = next(tokens)
-            if value in '()':
-                raise ParseError('Expected value, got %s instead' % cur)
-            right = cls.parse_root(tokens)
-            result = cls(value, left, right)
-        # make sure that next token is ')' for cases 2 and 3
-        cur = next(tokens)
-        if cur != ')':
-            raise ParseError('Expected right paren, got %s instead' % cur)
-        return result
+            return ParseError('Unexpected %s after the end of the tree at position %d' % (token, pos))
+        return ParseError('Expected %s, got %s instead at position %d' % (expected, token, pos))
+
+    @classmethod
+    def parse(cls, tokens):
+        """Build a tree from the tokens produced by `tokenize`.
+
+        :return: the root of the tree (None for the empty tree `()`)
+        :raises ParseError: on invalid input, with the position of the offending token
+        """
+        (LEFT, RIGHT, ROOT, VALUE, CLOSE, NEXT) = (cls._LEFT, cls._RIGHT, cls._ROOT, cls._VALUE, cls._CLOSE, cls._NEXT)
+        # items are the complete subtrees and the values of the open subtrees; the stack holds the state to restore
+        # when each open subtree is closed
+        items = []
+        push = items.append
+        pop = items.pop
+        stack = []
+        save = stack.append
+        restore = stack.pop
+        state = ROOT
+        root = None
+        for (chunk, text, offset) in tokens:
+            if root is None:
+                root = cls._position(chunk, 0, text, offset)
+            it = iter(chunk)
+            for token in it:
+                if token[0] == '(':
+                    if state > ROOT:
+                        break
+                    if token == '(':
+                        save(state)
+                        state = LEFT
+                    else:
+                        push(cls(token[1:-1]) if len(token) > 2 else None)
+                        state = NEXT[state]
+                elif token == ')':
+                    if state != CLOSE:
+                        break
+                    right = pop()
+                    value = pop()
+                    push(cls(value, pop(), right))
+                    state = NEXT[restore()]
+                else:
+                    if state != VALUE:
+                        break
+                    push(token)
+                    state = RIGHT
+            else:
+                continue
+            # the loop was left on an unexpected token
+            raise cls._error(state, token, cls._position(chunk, len(chunk) - operator.length_hint(it) - 1, text,
+                                                         offset))
+        if state != cls._DONE:
+            if root is None:
+                raise ParseError('Unexpected end of input: expected left paren')
+            raise ParseError('Unexpected end of input: left paren at position %d is not closed' % root)
+        return items[0]
 
     @classmethod
     def from_string(cls, s):
-        return cls.parse_root(cls.tokenize(s))
+        """Parse a tree from a string."""
+        return cls.parse(cls.tokenize([s]))
+
+    @classmethod
+    def from_file(cls, f, chunk_size=1 << 16):
+        """Parse a tree from a file, read in chunks of `chunk_size`.
+
+        :param f: a text or binary file (binary input is decoded as UTF-8, positions are then counted in characters)
+        """
+        first = f.read(chunk_size)
+        chunks = itertools.chain([first], iter(lambda: f.read(chunk_size), first[:0]))
+        if isinstance(first, bytes):
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            chunks = itertools.chain((decoder.decode(chunk) for chunk in chunks), [decoder.decode(b'', final=True)])
+        return cls.parse(cls.tokenize(chunks))
+
+class ArrayTree(object):
+    """Compact storage for large binary trees.
+
+    Nodes are integer ids indexing three parallel arrays: the code of the node value, and the ids of the left and
+    right children (-1 for an empty subtree). Values are interned: each distinct value (e.g. `OP|+`) is stored once
+    in `labels`, and nodes only hold its index. A node costs a few machine words instead of a full Python object.
+
+    `node(i)` returns a lightweight `ArrayNode` view of node i which has the same interface as a `BTree` node.
+    Subtrees may be shared between several parents, so DAGs are supported as well.
+    """
+
+    def __init__(self):
+        self.codes = array('l')
+        self.left = array('l')
+        self.right = array('l')
+        self.labels = []
+        self.label_codes = {}
+        self.root = -1
+
+    def __len__(self):
+        return len(self.codes)
+
+    def add(self, value, left=-1, right=-1):
+        """Add a node with the given value and children ids, and return its id."""
+        code = self.label_codes.get(value)
+        if code is None:
+            code = len(self.labels)
+            self.label_codes[value] = code
+            self.labels.append(value)
+        self.codes.append(code)
+        self.left.append(left)
+        self.right.append(right)
+        return len(self.codes) - 1
+
+    def node(self, i):
+        """Return a view of node i, or None if i is -1."""
+        return None if i < 0 else ArrayNode(self, i)
+
+    @property
+    def tree(self):
+        """View of the root node."""
+        return self.node(self.root)
+
+    @classmethod
+    def from_btree(cls, t):
+        """Copy a tree made of `TreeNode` objects. Shared subtrees are stored once."""
+        result = cls()
+        ids = {None: -1}
+        # post-order traversal with an explicit stack, so that deep trees can be converted
+        stack = [t]
+        while len(stack) > 0:
+            p = stack[-1]
+            if p in ids:
+                stack.pop()
+                continue
+            pending = [c for c in (p.left, p.right) if c not in ids]
+            if len(pending) > 0:
+                stack.extend(pending)
+            else:
+                stack.pop()
+                ids[p] = result.add(p.value, ids[p.left], ids[p.right])
+        result.root = ids[t]
+        return result
+
+    def to_btree(self, i=None):
+        """Return node i (the root by default) and its descendants as a `BTree`."""
+        if i is None:
+            i = self.root
+        trees = {-1: None}
+        stack = [i]
+        while len(stack) > 0:
+            j = stack[-1]
+            if j in trees:
+                stack.pop()
+                continue
+            pending = [c for c in (self.left[j], self.right[j]) if c not in trees]
+            if len(pending) > 0:
+                stack.extend(pending)
+            else:
+                stack.pop()
+                trees[j] = BTree(self.labels[self.codes[j]], trees[self.left[j]], trees[self.right[j]])
+        return trees[i]
+
+class ArrayNode(TreeNode):
+    """View of a node of an `ArrayTree`. Two views of the same node compare equal."""
+    __slots__ = ('store', 'id')
+
+    def __init__(self, store, i):
+        self.store = store
+        self.id = i
+
+    @property
+    def value(self):
+        return self.store.labels[self.store.codes[self.id]]
+
+    @property
+    def left(self):
+        return self.store.node(self.store.left[self.id])
+
+    @property
+    def right(self):
+        return self.store.node(self.store.right[self.id])
+
+    def __eq__(self, other):
+        # a new view is created on each access to a child: comparing (and hashing) views by position rather than by
+        # identity lets the functions that keep track of visited nodes use them as dict keys, for both `BTree` nodes
+        # (which compare by identity) and `ArrayNode` views
+        return isinstance(other, ArrayNode) and self.store is other.store and self.id == other.id
+
+    def __hash__(self):
+        return hash((id(self.store), self.id))
 
 def in_order(t):
     """Inorder traversal of a binary tree without recursion (algorithm T from 2.3.1)
@@ -117,8 +330,11 @@ def in_order(t):
     :param t: a `BTree` to traverse
     :return: the list of nodes in inorder
     """
-    # step T1 : initialize stack and result list
-    res = []
+    return list(iter_in_order(t))
+
+def iter_in_order_nodes(t):
+    """Generate the nodes of a binary tree in inorder, without recursion (algorithm T from 2.3.1)."""
+    # step T1 : initialize stack
     p = t
     a = []
     # initial pass of step T2/T3
@@ -128,26 +344,222 @@ def in_order(t):
     # step T4/T5 : empty stack, occasionally filling it back from right subtrees
     while len(a) > 0:
         p = a.pop()
-        res.append(p.value)
+        yield p
         p = p.right
         # step T2/T3 for right subtrees
         while p is not None:
             a.append(p)
             p = p.left
-    return res
 
-def differentiate(t, x):
+def iter_in_order(t):
+    """Generate the values of the nodes of a binary tree in inorder (see `iter_in_order_nodes`)."""
+    for p in iter_in_order_nodes(t):
+        yield p.value
+
+def iter_pre_order(t):
+    """Generate the values of the nodes of a binary tree in preorder, using a stack of pending right subtrees."""
+    a = [t]
+    while len(a) > 0:
+        p = a.pop()
+        while p is not None:
+            yield p.value
+            if p.right is not None:
+                a.append(p.right)
+            p = p.left
+
+def iter_post_order(t):
+    """Generate the values of the nodes of a binary tree in postorder.
+
+    The stack holds (node, visited) pairs: a node is first expanded into its subtrees, and output when it comes back
+    to the top of the stack once they have been visited. Nodes are never compared, so a subtree shared by several
+    parents (in a DAG) is visited once per parent, and the nodes may be views created on each access (`ArrayNode`).
+    """
+    a = [(t, False)]
+    while len(a) > 0:
+        (p, visited) = a.pop()
+        if p is None:
+            continue
+        if visited:
+            yield p.value
+        else:
+            a.append((p, True))
+            a.append((p.right, False))
+            a.append((p.left, False))
+
+def iter_level_order(t):
+    """Generate the values of the nodes of a binary tree level by level, from left to right, using a queue."""
+    queue = collections.deque([t])
+    while len(queue) > 0:
+        p = queue.popleft()
+        if p is not None:
+            yield p.value
+            queue.append(p.left)
+            queue.append(p.right)
+
+class ThreadedTree(object):
+    """Threaded representation of a binary tree (2.3.1).
+
+    Nodes are integer indices into the parallel lists INFO, LLINK and RLINK, and the tags LTAG and RTAG. Empty links
+    are replaced by threads: an empty right link points to the inorder successor of the node and an empty left link
+    to its inorder predecessor, with the tag set to 1. Node 0 is the list head: LLINK(HEAD) is the root, and
+    RLINK(HEAD) = HEAD; the threads of the first and last nodes in inorder point to HEAD.
+    With threads, the inorder successor of any node is found without a stack (algorithm S).
+    """
+
+    def __init__(self, t):
+        self.info = [None]
+        self.llink = array('l', [0])
+        self.rlink = array('l', [0])
+        self.ltag = bytearray([1])
+        self.rtag = bytearray([0])
+        # inorder traversal (algorithm T) numbering the nodes as they are visited. Each stack entry is a list
+        # [node, number of its left child, owner], where owner is -1 for a left child (whose parent is the entry just
+        # below it), the number of the parent for a right child, or 0 for the root (linked from HEAD).
+        # Nodes are identified by their position in the traversal only, so views (`ArrayNode`) and shared subtrees
+        # are supported; a shared subtree is copied once per parent.
+        a = []
+        p = t
+        owner = 0
+        while True:
+            while p is not None:
+                a.append([p, 0, owner])
+                p = p.left
+                owner = -1
+            if len(a) == 0:
+                break
+            (p, left, owner) = a.pop()
+            i = len(self.info)
+            self.info.append(p.value)
+            if owner == -1:
+                a[-1][1] = i
+            elif owner == 0:
+                self.llink[0] = i
+                self.ltag[0] = 0
+            else:
+                self.rlink[owner] = i
+                self.rtag[owner] = 0
+            if left != 0:
+                self.llink.append(left)
+                self.ltag.append(0)
+            else:
+                # thread to the inorder predecessor
+                self.llink.append(i - 1)
+                self.ltag.append(1)
+            # thread to the inorder successor, replaced by a link if the node has a right child
+            self.rlink.append(i + 1)
+            self.rtag.append(1)
+            p = p.right
+            owner = i
+        if len(self.info) > 1:
+            self.rlink[-1] = 0
+
+    def __len__(self):
+        return len(self.info) - 1
+
+    def successor(self, p):
+        """Return the inorder successor of node p (algorithm S), or 0 (HEAD) if p is the last node.
+
+        The successor of HEAD is the first node in inorder.
+        """
+        # step S1
+        q = self.rlink[p]
+        if self.rtag[p] == 1:
+            return q
+        # step S2
+        while self.ltag[q] == 0:
+            q = self.llink[q]
+        return q
+
+    def predecessor(self, p):
+        """Return the inorder predecessor of node p, or 0 (HEAD) if p is the first node (algorithm S, mirrored)."""
+        q = self.llink[p]
+        if self.ltag[p] == 1:
+            return q
+        while self.rtag[q] == 0:
+            q = self.rlink[q]
+        return q
+
+    def __iter__(self):
+        """Generate the values of the nodes in inorder, by following successors from HEAD."""
+        p = self.successor(0)
+        while p != 0:
+            yield self.info[p]
+            p = self.successor(p)
+
+class NodeFactory(object):
+    """Hash-consing factory for `BTree` nodes.
+
+    Calling the factory with a value and two children returns the existing node with that value and those children
+    if there is one, and creates it otherwise. Since children are themselves built by the factory, structurally equal
+    subtrees are represented by a single node, and expressions become DAGs. Nodes are identified by (value, id(left),
+    id(right)): ids are stable since the factory keeps every node (and therefore its children) alive.
+
+    The factory also holds the memo used by `differentiate`, so that each (node, variable) pair is differentiated once.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.derivatives = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __call__(self, value, left=None, right=None):
+        key = (value, id(left), id(right))
+        node = self.nodes.get(key)
+        if node is None:
+            node = BTree(value, left, right)
+            self.nodes[key] = node
+        return node
+
+    def intern(self, t):
+        """Return the node of this factory structurally equal to tree `t`, creating the missing nodes as needed."""
+        if t is None or self.nodes.get((t.value, id(t.left), id(t.right))) is t:
+            # nodes built by the factory are already canonical
+            return t
+        shared = {None: None}
+        stack = [t]
+        while len(stack) > 0:
+            p = stack[-1]
+            (left, right) = (p.left, p.right)
+            if left not in shared:
+                stack.append(left)
+                if right not in shared:
+                    stack.append(right)
+            elif right not in shared:
+                stack.append(right)
+            else:
+                # both children are interned (a node met twice is interned again, to the same node)
+                stack.pop()
+                shared[p] = self(p.value, shared[left], shared[right])
+        return shared[t]
+
+def differentiate(t, x, factory=None):
     """Differentiate a tree `t` with respect to variable `x`.
 
      The algorithm is based on algorithm D from 2.3.2. The main difference is the use of the original tree structure
      (although in `BTree` format) rather than the binary tree transformation. Accordingly, the tree is traversed in
-     post- rather than inorder; this is done recursively rather than using a threaded representation.
+     post- rather than inorder; this is done with an explicit stack rather than using a threaded representation, so
+     that the depth of the tree is not limited by the recursion limit. The `TYPE|VALUE` split of each distinct node
+     value is only computed once.
+
+     If a `NodeFactory` is given, `t` is first interned in it, the result is built from shared nodes, and derivatives
+     are memoized per (node, variable): identical subexpressions are only differentiated once, which keeps repeated
+     differentiation (e.g. second derivatives with respect to several variables) polynomial in size and time.
 
     :param t: `BTree` to be differentiated. Node structure should be `TYPE|VALUE` where `TYPE` is one of the following:
     `CONST`, `VAR`, `OP`. See tAoCP for the list of supported operators (which also includes a few functions).
     :param x: The variable used for differentiation. If y != x, `VAR|<y>` is considered as a constant.
+    :param factory: an optional `NodeFactory`
     :return: `BTree` of the derivative
     """
+    if factory is None:
+        make = BTree
+        memo = {}
+    else:
+        make = factory
+        t = factory.intern(t)
+        memo = factory.derivatives
 
     # helper functions
     def is_zero(t):
@@ -157,7 +569,7 @@ def differentiate(t, x):
         return t.value == 'CONST|1'
 
     def zero():
-        return BTree('CONST|0')
+        return make('CONST|0')
 
     def mult(u, v):
         if is_zero(u) or is_zero(v):
@@ -167,7 +579,7 @@ def differentiate(t, x):
         elif is_one(v):
             return u
         else:
-            return BTree('OP|*', u, v)
+            return make('OP|*', u, v)
 
     def add(u, v):
         if is_zero(u):
@@ -175,15 +587,15 @@ def differentiate(t, x):
         elif is_zero(v):
             return u
         else:
-            return BTree('OP|+', u, v)
+            return make('OP|+', u, v)
 
     def sub(u, v):
         if is_zero(v):
-            return du
+            return u
         elif is_zero(u):
-            return BTree('OP|neg', v)
+            return make('OP|neg', v)
         else:
-            return BTree('OP|-', u, v)
+            return make('OP|-', u, v)
 
     def div(u, v):
         if is_zero(u):
@@ -193,67 +605,101 @@ def differentiate(t, x):
         elif is_zero(v):
             raise MathError("Division by zero")
         else:
-            return BTree('OP|/', u, v)
+            return make('OP|/', u, v)
 
     def pow(u, v):
         if is_zero(u):
             return zero()
         elif is_zero(v) or is_one(u):
-            return BTree('CONST|1')
+            return make('CONST|1')
         else:
-            return BTree('OP|^', u, v)
-
-    # get type and value of node
-    (ty, val) = t.value.split('|')
-    # check for leave cases : CONST, VAR
-    if ty == 'CONST':
-        return zero()
-    if ty == 'VAR':
-        if val == x:
-            return BTree('CONST|1')
-        else:
-            return zero()
-
-    #at this point `ty` should only be `OP`
-    if ty != 'OP':
-        raise ParseError("Unexpected type %s" % ty)
-    # switch according to operator value. Start with unary operators, using the derivative of the left subtree
-    u = t.left
-    du = differentiate(u, x)
-    du_equals_zero = is_zero(du)
-    if val == 'neg':
-        if du_equals_zero:
-            return zero()
-        else:
-            return BTree('OP|neg', du)
-    elif val == 'ln':
-        if du_equals_zero:
-            # we're taking ln of a constant, so the derivative should be zero (rather than a math error)
-            return zero()
+            return make('OP|^', u, v)
+
+    # list the nodes to differentiate in post-order, with an explicit stack. Nodes whose derivative is already known
+    # (shared subtrees, memoized nodes) are only listed once.
+    derivatives = {}
+    nodes = []
+    stack = [(t, False)]
+    while len(stack) > 0:
+        (p, expanded) = stack.pop()
+        if expanded:
+            nodes.append(p)
+            continue
+        if p in derivatives:
+            continue
+        if factory is not None and (p, x) in memo:
+            derivatives[p] = memo[(p, x)]
+            continue
+        derivatives[p] = None
+        stack.append((p, True))
+        if p.left is not None:
+            stack.append((p.left, False))
+            if p.right is not None:
+                stack.append((p.right, False))
+    # (type, value) for each distinct node value
+    kinds = {}
+    for p in nodes:
+        # get type and value of node
+        kind = kinds.get(p.value)
+        if kind is None:
+            kind = kinds[p.value] = tuple(p.value.split('|'))
+        (ty, val) = kind
+        # check for leave cases : CONST, VAR
+        if ty == 'CONST':
+            d = zero()
+        elif ty == 'VAR':
+            if val == x:
+                d = make('CONST|1')
+            else:
+                d = zero()
+        elif ty != 'OP':
+            raise ParseError("Unexpected type %s" % ty)
         else:
-            return BTree('OP|/', du, u)
-    # moving on to binary operators; now we also need the right subtree
-    v = t.right
-    dv = differentiate(v, x)
-    dv_equals_zero = is_zero(dv)
-    if val == '+':
-        return add(du, dv)
-    if val == '-':
-        return sub(du, dv)
-    if val == '*':
-        return add(mult(u, dv), mult(du, v))
-    if val == '/':
-        left = div(du, v)
-        num = mult(u, dv)
-        denom = pow(v, BTree('CONST|2'))
-        right = div(num, denom)
-        return sub(left, right)
-    if val == '^':
-        # first = D(u) * v * u^(v - 1)
-        first = mult(du, mult(v, pow(u, sub(v, BTree('CONST|1')))))
-        # second = ln(u) * dv * u^v
-        second = mult(BTree('OP|ln', u), mult(dv, pow(u, v)))
-        return add(first, second)
+            # switch according to operator value. Start with unary operators, using the derivative of the left subtree
+            u = p.left
+            du = derivatives[u]
+            du_equals_zero = is_zero(du)
+            if val == 'neg':
+                if du_equals_zero:
+                    d = zero()
+                else:
+                    d = make('OP|neg', du)
+            elif val == 'ln':
+                if du_equals_zero:
+                    # we're taking ln of a constant, so the derivative should be zero (rather than a math error)
+                    d = zero()
+                else:
+                    d = make('OP|/', du, u)
+            else:
+                # moving on to binary operators; now we also need the right subtree
+                v = p.right
+                if v is None:
+                    raise ParseError("Missing right operand for %s" % val)
+                dv = derivatives[v]
+                if val == '+':
+                    d = add(du, dv)
+                elif val == '-':
+                    d = sub(du, dv)
+                elif val == '*':
+                    d = add(mult(u, dv), mult(du, v))
+                elif val == '/':
+                    left = div(du, v)
+                    num = mult(u, dv)
+                    denom = pow(v, make('CONST|2'))
+                    right = div(num, denom)
+                    d = sub(left, right)
+                elif val == '^':
+                    # first = D(u) * v * u^(v - 1)
+                    first = mult(du, mult(v, pow(u, sub(v, make('CONST|1')))))
+                    # second = ln(u) * dv * u^v
+                    second = mult(make('OP|ln', u), mult(dv, pow(u, v)))
+                    d = add(first, second)
+                else:
+                    raise ParseError("Unexpected operator %s" % val)
+        derivatives[p] = d
+        if factory is not None:
+            memo[(p, x)] = d
+    return derivatives[t]
 
 if __name__ == '__main__':
     # TODO : turn into real unit tests